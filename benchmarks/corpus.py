@@ -0,0 +1,87 @@
+import random
+from dataclasses import dataclass
+
+from markdown_pdf import MarkdownPdf, Section
+
+CYRILLIC_WORDS = (
+    'лекция', 'давление', 'дыхание', 'лёгкие', 'бронхи', 'терапия', 'пациент', 'диагноз', 'функция',
+    'обструкция', 'воспаление', 'симптом', 'течение', 'лечение', 'профилактика', 'исследование',
+)
+LATIN_WORDS = (
+    'lecture', 'pressure', 'airway', 'lung', 'therapy', 'patient', 'diagnosis', 'function',
+    'obstruction', 'inflammation', 'symptom', 'treatment', 'study', 'value', 'result',
+)
+TABLE_CSS = 'table, th, td {border: 1px solid black; border-collapse: collapse;}'
+
+
+@dataclass(frozen=True)
+class CorpusSpec(object):
+    name: str
+    pages: int = 10
+    words_per_page: int = 250
+    tables_per_page: int = 0
+    table_rows: int = 6
+    table_cols: int = 4
+    cyrillic: bool = True
+    seed: int = 0
+
+
+DEFAULT_CORPUS = (
+    CorpusSpec('text-10', pages=10),
+    CorpusSpec('text-100', pages=100),
+    CorpusSpec('dense-30', pages=30, words_per_page=450),
+    CorpusSpec('tables-30', pages=30, words_per_page=120, tables_per_page=2),
+    CorpusSpec('latin-30', pages=30, cyrillic=False),
+)
+
+
+def _paragraph(rnd: random.Random, words: tuple, count: int) -> str:
+    sentence = []
+    for index in range(count):
+        word = rnd.choice(words)
+        sentence.append(word.capitalize() if index % 12 == 0 else word)
+        if index % 12 == 11:
+            sentence[-1] += '.'
+    return ' '.join(sentence) + '.'
+
+
+def _table(rnd: random.Random, words: tuple, rows: int, cols: int) -> str:
+    header = '| ' + ' | '.join(rnd.choice(words) for _ in range(cols)) + ' |'
+    divider = '|' + '---|' * cols
+    body = [
+        '| ' + ' | '.join(str(rnd.randint(0, 999)) for _ in range(cols)) + ' |'
+        for _ in range(rows)
+    ]
+    return '\n'.join([header, divider, *body])
+
+
+def page_markdown(spec: CorpusSpec, page_num: int) -> str:
+    """
+    Returns deterministic Markdown for one page of a synthetic document.
+    """
+    rnd = random.Random(f'{spec.seed}:{spec.name}:{page_num}')
+    words = CYRILLIC_WORDS if spec.cyrillic else LATIN_WORDS
+    blocks = [f'## {rnd.choice(words).capitalize()} {page_num + 1}']
+    paragraphs = max(1, spec.words_per_page // 60)
+    for index in range(paragraphs):
+        blocks.append(_paragraph(rnd, words, spec.words_per_page // paragraphs))
+        if index < spec.tables_per_page:
+            blocks.append(_table(rnd, words, spec.table_rows, spec.table_cols))
+    return '\n\n'.join(blocks)
+
+
+def build_pdf(spec: CorpusSpec) -> bytes:
+    """
+    Renders a synthetic PDF for the given spec, one Markdown section per page.
+
+    Args:
+        spec (CorpusSpec): Page count, text density, table count and language of the document.
+
+    Returns:
+        bytes: PDF document.
+    """
+    pdf = MarkdownPdf(toc_level=0)
+    for page_num in range(spec.pages):
+        pdf.add_section(Section(page_markdown(spec, page_num), toc=False), user_css=TABLE_CSS)
+    pdf.writer.close()
+    return pdf.out_file.getvalue()
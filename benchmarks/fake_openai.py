@@ -0,0 +1,241 @@
+"""Local stand-in for the OpenAI chat completions and embeddings API.
+
+Responses are deterministic: a completion is a digest of the last user message and an
+embedding is a unit vector seeded by the hash of its input. Latency follows a
+log-normal distribution and a share of requests is rejected with 429.
+
+Usage:
+    python -m benchmarks.fake_openai --port 8089 --chat-latency 1.5 --rate-limit-ratio 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 celery -A package.celery.worker worker
+"""
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Union
+
+
+@dataclass(frozen=True)
+class FakeOpenAIConfig(object):
+    chat_latency: float = 1.0
+    chat_latency_sigma: float = 0.5
+    chat_latency_per_token: float = 0.0
+    embeddings_latency: float = 0.2
+    embeddings_latency_sigma: float = 0.3
+    rate_limit_ratio: float = 0.0
+    retry_after: float = 1.0
+    dimension: int = 1536
+    completion_words: int = 120
+    seed: int = 0
+
+
+def fake_embedding(value: Union[str, List[int]], dimension: int) -> List[float]:
+    """
+    Returns a deterministic unit vector for an input text or token list.
+    """
+    rnd = random.Random(hashlib.sha256(json.dumps(value, ensure_ascii=False).encode()).digest())
+    vector = [rnd.gauss(0, 1) for _ in range(dimension)]
+    norm = math.sqrt(sum(component * component for component in vector)) or 1.0
+    return [component / norm for component in vector]
+
+
+def fake_completion(messages: List[Dict[str, Any]], words: int) -> str:
+    """
+    Returns a deterministic answer: a digest line and the first words of the last user message.
+    """
+    user_messages = [message.get('content') or '' for message in messages if message.get('role') == 'user']
+    text = user_messages[-1] if user_messages else ''
+    digest = hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode()).hexdigest()[:12]
+    return f'Summary {digest}:\n' + ' '.join(text.split()[:words])
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeOpenAIConfig):
+        super().__init__(address, FakeOpenAIHandler)
+        self.config = config
+        self.counters: Counter = Counter()
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def draw_latency(self, median: float, sigma: float) -> float:
+        with self._lock:
+            return median * math.exp(self._random.gauss(0, sigma)) if median > 0 else 0.0
+
+    def draw_rate_limited(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.config.rate_limit_ratio
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server: FakeOpenAIServer
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.endswith('/chat/completions'):
+            self._handle_chat(payload)
+        elif self.path.endswith('/embeddings'):
+            self._handle_embeddings(payload)
+        else:
+            self._send(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+
+    def log_message(self, format: str, *args) -> None:  # noqa: WPS125
+        logging.debug(format % args)  # noqa: WPS323
+
+    def _handle_chat(self, payload: Dict[str, Any]) -> None:
+        config = self.server.config
+        if self._reject('chat'):
+            return
+        messages = payload.get('messages', [])
+        content = fake_completion(messages, config.completion_words)
+        prompt_tokens = sum(len((message.get('content') or '').split()) for message in messages)
+        completion_tokens = len(content.split())
+        latency = self.server.draw_latency(config.chat_latency, config.chat_latency_sigma)
+        time.sleep(latency + completion_tokens * config.chat_latency_per_token)
+        self.server.count('chat')
+        self._send(200, {
+            'id': f'chatcmpl-{hashlib.sha256(content.encode()).hexdigest()[:24]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _handle_embeddings(self, payload: Dict[str, Any]) -> None:
+        config = self.server.config
+        if self._reject('embeddings'):
+            return
+        inputs = payload.get('input', [])
+        # Один текст или один список токенов приходит без внешнего списка
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        time.sleep(self.server.draw_latency(config.embeddings_latency, config.embeddings_latency_sigma))
+        data = []
+        for index, value in enumerate(inputs):
+            vector = fake_embedding(value, config.dimension)
+            if payload.get('encoding_format') == 'base64':
+                # Клиент openai по умолчанию запрашивает base64 с float32 little-endian
+                vector = base64.b64encode(array('f', vector).tobytes()).decode()
+            data.append({'object': 'embedding', 'index': index, 'embedding': vector})
+        tokens = sum(len(value) if isinstance(value, list) else len(value.split()) for value in inputs)
+        self.server.count('embeddings')
+        self.server.count('embedding_inputs', len(inputs))
+        self._send(200, {
+            'object': 'list',
+            'data': data,
+            'model': payload.get('model', 'fake'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+        })
+
+    def _reject(self, endpoint: str) -> bool:
+        if not self.server.draw_rate_limited():
+            return False
+        self.server.count(f'{endpoint}_429')
+        self._send(
+            429,
+            {'error': {'message': 'Rate limit reached (fake).', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+            {'Retry-After': str(self.server.config.retry_after)},
+        )
+        return True
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def serve_in_background(config: FakeOpenAIConfig, host: str = '127.0.0.1', port: int = 0) -> FakeOpenAIServer:
+    """
+    Starts the server in a daemon thread and returns it; port 0 picks a free port.
+    """
+    server = FakeOpenAIServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name='fake-openai', daemon=True).start()
+    logging.info(f'Fake OpenAI API listening on {server.base_url}')
+    return server
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--chat-latency', type=float, default=1.0, help='Median chat latency in seconds.')
+    parser.add_argument('--chat-latency-sigma', type=float, default=0.5, help='Log-normal sigma of chat latency.')
+    parser.add_argument('--chat-latency-per-token', type=float, default=0.0, help='Extra seconds per completion token.')
+    parser.add_argument('--embeddings-latency', type=float, default=0.2, help='Median embeddings latency in seconds.')
+    parser.add_argument(
+        '--embeddings-latency-sigma', type=float, default=0.3, help='Log-normal sigma of embeddings latency.',
+    )
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help='Share of requests rejected with 429.')
+    parser.add_argument('--dimension', type=int, default=1536, help='Embedding dimension.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of latency and 429 draws.')
+
+
+def config_from_args(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(
+        chat_latency=args.chat_latency,
+        chat_latency_sigma=args.chat_latency_sigma,
+        chat_latency_per_token=args.chat_latency_per_token,
+        embeddings_latency=args.embeddings_latency,
+        embeddings_latency_sigma=args.embeddings_latency_sigma,
+        rate_limit_ratio=args.rate_limit_ratio,
+        dimension=args.dimension,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Fake OpenAI API for offline load tests.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = FakeOpenAIServer((args.host, args.port), config_from_args(args))
+    logging.info(f'Fake OpenAI API listening on {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info(f'Stopped, served: {server.stats()}')
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
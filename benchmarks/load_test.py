@@ -0,0 +1,164 @@
+"""Load test of process_document against the fake OpenAI API.
+
+Corpus documents are uploaded to MinIO and process_document is started at a fixed
+rate (open loop), so queueing shows up in the latency instead of lowering the load.
+MinIO, Milvus, Redis and the database from the environment are used as is; only
+OpenAI is replaced.
+
+Usage:
+    python -m benchmarks.load_test --fake --rate 0.5 --documents 20 --output load.json
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8089/v1 --mode celery --rate 2
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, replace
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from benchmarks.corpus import DEFAULT_CORPUS, CorpusSpec, build_pdf
+from benchmarks.fake_openai import add_config_arguments, config_from_args, serve_in_background
+from benchmarks.pdf_extraction import _git_revision  # noqa: WPS450
+
+
+def percentile(values: List[float], share: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def upload_corpus(specs: List[CorpusSpec], documents: int, unique: bool, bucket: str) -> List[str]:
+    """
+    Uploads the documents of the run and returns their object names in submission order.
+
+    With unique, every document gets its own seed, so no cache can serve it.
+    """
+    from internal.config import get_minio_client
+
+    minio_client = get_minio_client()
+    uploaded: Dict[CorpusSpec, str] = {}
+    object_names = []
+    for index in range(documents):
+        spec = specs[index % len(specs)]
+        if unique:
+            spec = replace(spec, seed=spec.seed + index + 1)
+        if spec not in uploaded:
+            object_name = f'load-test/{spec.name}-{spec.seed}.pdf'
+            minio_client.upload_file_to_bucket(file_io=BytesIO(build_pdf(spec)), bucket_name=bucket, object_name=object_name)
+            uploaded[spec] = object_name
+        object_names.append(uploaded[spec])
+    return object_names
+
+
+def run_load(object_names: List[str], bucket: str, rate: float, mode: str, prompt_type: str, workers: int) -> Dict[str, Any]:
+    """
+    Starts one process_document per object at the given rate and waits for all of them.
+    """
+    from package.celery.worker import process_document
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def run_one(object_name: str, submitted: float) -> None:
+        try:
+            if mode == 'celery':
+                process_document.delay(object_name, bucket, 'load-test', prompt_type).get()
+            else:
+                process_document(object_name, bucket, 'load-test', prompt_type)
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            logging.warning(f'{object_name} failed: {e}')
+            return
+        with lock:
+            latencies.append(time.perf_counter() - submitted)
+
+    started = time.perf_counter()
+    futures: List[Future] = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for index, object_name in enumerate(object_names):
+            # Открытая модель нагрузки: документы подаются по расписанию, а не по завершению предыдущих
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(run_one, object_name, time.perf_counter()))
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return {
+        'documents': len(object_names),
+        'completed': len(latencies),
+        'errors': errors,
+        'elapsed_sec': elapsed,
+        'throughput_docs_per_sec': len(latencies) / elapsed if elapsed else None,
+        'latency_sec': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'max': max(latencies) if latencies else None,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Load test of process_document against a fake OpenAI API.')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--fake', action='store_true', help='Start the fake OpenAI API in this process.')
+    target.add_argument('--base-url', help='Base URL of an already running fake OpenAI API.')
+    parser.add_argument('--mode', choices=('inline', 'celery'), default='inline',
+                        help='Run the task in this process or send it to Celery workers.')
+    parser.add_argument('--rate', type=float, default=1.0, help='Documents started per second.')
+    parser.add_argument('--documents', type=int, default=10, help='Number of documents to process.')
+    parser.add_argument('--case', action='append', help='Corpus case to use (repeatable).')
+    parser.add_argument('--unique', action='store_true', help='Make every document distinct to bypass caches.')
+    parser.add_argument('--prompt-type', default='retell', help='Prompt key passed to process_document.')
+    parser.add_argument('--workers', type=int, default=32, help='Maximum documents in flight in inline mode.')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = None
+    if args.fake:
+        if args.mode == 'celery':
+            parser.error('--fake only serves inline runs, start benchmarks.fake_openai for Celery workers.')
+        server = serve_in_background(config_from_args(args))
+    # Клиент OpenAI создаётся при импорте конфигурации, поэтому адрес задаётся до импорта воркера
+    os.environ['OPENAI_BASE_URL'] = server.base_url if server else args.base_url
+    os.environ.setdefault('OPENAI_TOKEN', 'fake')
+
+    from internal.config.settings import buckets
+
+    specs = [spec for spec in DEFAULT_CORPUS if not args.case or spec.name in args.case]
+    object_names = upload_corpus(specs, args.documents, args.unique, buckets['tmp'])
+    report: Dict[str, Any] = {
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'mode': args.mode,
+        'rate': args.rate,
+        'unique': args.unique,
+        'cases': [asdict(spec) for spec in specs],
+        'fake_openai': asdict(config_from_args(args)) if server else args.base_url,
+        'result': run_load(object_names, buckets['tmp'], args.rate, args.mode, args.prompt_type, args.workers),
+    }
+    if server:
+        report['fake_openai_requests'] = server.stats()
+    if args.mode == 'inline':
+        from internal.config import get_gpt_client
+        report['client_metrics'] = get_gpt_client().metrics()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2, default=str)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))  # noqa: WPS421
+
+
+if __name__ == '__main__':
+    main()
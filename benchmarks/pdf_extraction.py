@@ -0,0 +1,144 @@
+"""Extraction throughput benchmark over a synthetic PDF corpus.
+
+Usage:
+    python -m benchmarks.pdf_extraction --output bench.json
+    python -m benchmarks.pdf_extraction --compare bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess  # noqa: S404
+import sys
+import time
+from dataclasses import asdict
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from benchmarks.corpus import DEFAULT_CORPUS, CorpusSpec, build_pdf
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()  # noqa: S603, S607
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_case(spec: CorpusSpec, repeat: int, worker: bool) -> Dict[str, Any]:
+    """
+    Runs one corpus document through every extraction stage and returns timings.
+
+    Executed in a fresh process, so peak RSS belongs to this case only.
+    """
+    from pydantic import SecretStr
+
+    from package.openai import ChatGPTClient
+    from package.pdf import PDFProcessor
+
+    pdf_data = build_pdf(spec)
+    # Ключ не используется: клиент нужен только ради токенизатора
+    chatgpt_client = ChatGPTClient(SecretStr('benchmark'))
+    stages: Dict[str, List[float]] = {'classify': [], 'extract': [], 'join': [], 'chunk': []}
+    pages = 0
+    for _ in range(repeat):
+        with PDFProcessor(BytesIO(pdf_data)) as pdf_processor:
+            pages = pdf_processor.pages
+            started = time.perf_counter()
+            pdf_processor.classify_pages()
+            stages['classify'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            pdf_processor.process_pdf()
+            stages['extract'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            long_text = '\n'.join(pdf_processor.extract())
+            stages['join'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        chatgpt_client.split_text_into_chunks(long_text, chunk_size=chatgpt_client.max_tokens)
+        stages['chunk'].append(time.perf_counter() - started)
+
+    if worker:
+        # Импорт воркера требует настроек окружения и доступных Milvus/MinIO
+        from package.celery.worker import process_pdf_and_extract
+        stages['process_pdf_and_extract'] = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            process_pdf_and_extract(BytesIO(pdf_data))
+            stages['process_pdf_and_extract'].append(time.perf_counter() - started)
+
+    best = {stage: min(timings) for stage, timings in stages.items()}
+    total = best['classify'] + best['extract']
+    return {
+        'spec': asdict(spec),
+        'pages': pages,
+        'bytes': len(pdf_data),
+        'text_chars': len(long_text),
+        'stages_sec': best,
+        'pages_per_sec': pages / total if total else None,
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def _run_isolated(spec: CorpusSpec, repeat: int, worker: bool) -> Dict[str, Any]:
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes=1, maxtasksperchild=1) as pool:
+        return pool.apply(run_case, (spec, repeat, worker))
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Returns human-readable lines with pages/sec ratios against a baseline report.
+    """
+    base_cases = {case['spec']['name']: case for case in baseline['cases']}
+    lines = []
+    for case in current['cases']:
+        name = case['spec']['name']
+        base = base_cases.get(name)
+        if base is None or not base['pages_per_sec'] or not case['pages_per_sec']:
+            continue
+        ratio = case['pages_per_sec'] / base['pages_per_sec']
+        rss = case['peak_rss_kb'] / base['peak_rss_kb'] if base['peak_rss_kb'] else 0
+        lines.append(
+            f'{name}: {case["pages_per_sec"]:.1f} pages/sec ({ratio:.2f}x), peak RSS {rss:.2f}x',
+        )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='PDF extraction throughput benchmark.')
+    parser.add_argument('--case', action='append', help='Run only the named corpus case (repeatable).')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case, the best time is reported.')
+    parser.add_argument('--worker', action='store_true', help='Also time process_pdf_and_extract from the worker.')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against.')
+    args = parser.parse_args(argv)
+
+    specs = [spec for spec in DEFAULT_CORPUS if not args.case or spec.name in args.case]
+    report = {
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'cases': [_run_isolated(spec, args.repeat, args.worker) for spec in specs],
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: WPS421
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)  # noqa: WPS421
+
+
+if __name__ == '__main__':
+    main()
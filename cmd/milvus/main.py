@@ -0,0 +1,68 @@
+"""Copy the embeddings collection without scalar fields into COLLECTION_NAME.
+
+Vectors get the prompt type and the document ID of their result from Postgres and
+the embeddings model the client uses; milvus_docs is repointed to the copies batch
+by batch. Vectors of results stored before the prompt type was recorded get an empty
+prompt type unless --prompt-type is given. The source collection is left in place.
+
+Usage:
+    python cmd/milvus/main.py --source pdf_embeddings
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.append(str(BASE_DIR))
+
+from internal.config import get_gpt_client, get_milvus_client  # noqa: E402
+from internal.config.settings import settings  # noqa: E402
+from internal.service.docs import MilvusDocsService  # noqa: E402
+from internal.service.utils import get_service  # noqa: E402
+
+
+async def get_scalars(milvus_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    async with get_service(MilvusDocsService) as milvus_docs_service:
+        return await milvus_docs_service.get_scalars(milvus_ids)
+
+
+async def remap(milvus_ids: Dict[int, int]) -> None:
+    async with get_service(MilvusDocsService) as milvus_docs_service:
+        await milvus_docs_service.remap(milvus_ids)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Copy an embeddings collection into one with scalar fields.')
+    parser.add_argument('--source', default='pdf_embeddings', help='Collection without scalar fields.')
+    parser.add_argument('--target', default=settings.COLLECTION_NAME, help='Collection to copy into.')
+    parser.add_argument('--prompt-type', default='', help='Prompt type of results stored without one.')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Vectors copied at once.')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    model = get_gpt_client().embeddings_model_name
+
+    def resolve(milvus_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        scalars = asyncio.run(get_scalars(milvus_ids))
+        for fields in scalars.values():
+            fields['prompt_type'] = fields['prompt_type'] or args.prompt_type
+            fields['model'] = model
+        return scalars
+
+    for milvus_ids in get_milvus_client().migrate_collection(
+        args.source,
+        args.target,
+        settings.EMBEDDINGS_DIMENSION,
+        resolve,
+        batch_size=args.batch_size,
+        num_partitions=settings.MILVUS_NUM_PARTITIONS,
+    ):
+        # Ссылки переносятся до чтения следующего пакета, поэтому прерванную миграцию можно перезапустить
+        asyncio.run(remap(milvus_ids))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from .settings import settings
 from .modules.milvus import get_milvus_client
-from .modules.gpt import get_gpt_client
+from .modules.gpt import get_gpt_client, get_prompt_manager, get_summarizer
 from .modules.minio import get_minio_client
 from .modules.database import get_database_client, override_session
+from .modules.cache import get_page_cache, get_redis_client
@@ -0,0 +1,21 @@
+# Фабрики для Redis и кэшей поверх него
+import redis
+
+from internal.config import settings
+from package.pdf import PageCache
+
+redis_client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=int(settings.REDIS_NAME))
+
+page_cache = PageCache(
+    maxsize=settings.PDF_PAGE_CACHE_SIZE,
+    redis_client=redis_client if settings.PDF_PAGE_CACHE_REDIS else None,
+    ttl=settings.PDF_PAGE_CACHE_TTL,
+)
+
+
+def get_redis_client() -> redis.Redis:
+    return redis_client
+
+
+def get_page_cache() -> PageCache:
+    return page_cache
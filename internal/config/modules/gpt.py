@@ -1,19 +1,110 @@
 # Фабрика для MinioClient
 from internal.config import settings
-from package.openai import ChatGPTClient, PromptManager
+from internal.config.modules.cache import get_redis_client
+from package.openai import (
+    DEFAULT_REDUCE_PROMPT,
+    AdaptiveConcurrencyLimiter,
+    ChatGPTClient,
+    ChunkSummarizer,
+    CompletionCache,
+    EmbeddingCache,
+    PromptManager,
+    RateLimiter,
+    RedisVectorStore,
+    SQLiteVectorStore,
+)
 from pydantic import SecretStr
 
+# Лимитеры учитываются по имени модели, поэтому имена задаются в одном месте
+chat_model_name = 'gpt-4o-mini'
+embeddings_model_name = 'text-embedding-ada-002'
+
 manager_prompt = PromptManager()
 system_prompt = manager_prompt.get_prompt('test')
 
+embedding_stores = {
+    'none': lambda: None,
+    # Redis служит и брокером Celery, поэтому векторы хранятся ограниченное время
+    'redis': lambda: RedisVectorStore(get_redis_client(), ttl=settings.OPENAI_EMBEDDINGS_CACHE_TTL),
+    'sqlite': lambda: SQLiteVectorStore(settings.OPENAI_EMBEDDINGS_CACHE_PATH),
+}
+embedding_cache = EmbeddingCache(
+    maxsize=settings.OPENAI_EMBEDDINGS_CACHE_SIZE,
+    store=embedding_stores[settings.OPENAI_EMBEDDINGS_CACHE_BACKEND](),
+)
+completion_cache = CompletionCache(
+    maxsize=settings.OPENAI_COMPLETION_CACHE_SIZE,
+    ttl=settings.OPENAI_COMPLETION_CACHE_TTL,
+    redis_client=get_redis_client() if settings.OPENAI_COMPLETION_CACHE_REDIS else None,
+)
+
+rate_limit_redis = get_redis_client() if settings.OPENAI_RATE_LIMIT_REDIS else None
+chat_rate_limiter = RateLimiter(
+    chat_model_name,
+    tokens_per_minute=settings.OPENAI_CHAT_TPM,
+    requests_per_minute=settings.OPENAI_CHAT_RPM,
+    redis_client=rate_limit_redis,
+)
+embeddings_rate_limiter = RateLimiter(
+    embeddings_model_name,
+    tokens_per_minute=settings.OPENAI_EMBEDDINGS_TPM,
+    requests_per_minute=settings.OPENAI_EMBEDDINGS_RPM,
+    redis_client=rate_limit_redis,
+)
+
+chat_concurrency_limiter = None
+embeddings_concurrency_limiter = None
+if settings.OPENAI_ADAPTIVE_CONCURRENCY:
+    # Пулы потоков рассчитаны на верхнюю границу, фактический параллелизм задаёт лимитер
+    chat_concurrency_limiter = AdaptiveConcurrencyLimiter(
+        chat_model_name,
+        initial_limit=settings.OPENAI_CONCURRENCY,
+        max_limit=settings.OPENAI_CONCURRENCY_MAX,
+        latency_target=settings.OPENAI_LATENCY_TARGET,
+    )
+    embeddings_concurrency_limiter = AdaptiveConcurrencyLimiter(
+        embeddings_model_name,
+        initial_limit=settings.OPENAI_EMBEDDINGS_CONCURRENCY,
+        max_limit=settings.OPENAI_CONCURRENCY_MAX,
+        latency_target=settings.OPENAI_LATENCY_TARGET,
+    )
+
 api_key = SecretStr(settings.OPENAI_TOKEN)
 client = ChatGPTClient(
     api_key,
-    model_name='gpt-4o-mini',
-    embeddings_model_name='text-embedding-ada-002',
+    model_name=chat_model_name,
+    embeddings_model_name=embeddings_model_name,
     system_prompt=system_prompt,
+    embeddings_batch_tokens=settings.OPENAI_EMBEDDINGS_BATCH_TOKENS,
+    embeddings_batch_size=settings.OPENAI_EMBEDDINGS_BATCH_SIZE,
+    embeddings_concurrency=(
+        settings.OPENAI_CONCURRENCY_MAX if settings.OPENAI_ADAPTIVE_CONCURRENCY else settings.OPENAI_EMBEDDINGS_CONCURRENCY
+    ),
+    embedding_cache=embedding_cache,
+    completion_cache=completion_cache,
+    chunk_overlap=settings.OPENAI_CHUNK_OVERLAP,
+    chat_rate_limiter=chat_rate_limiter,
+    embeddings_rate_limiter=embeddings_rate_limiter,
+    completion_tokens_estimate=settings.OPENAI_COMPLETION_TOKENS_ESTIMATE,
+    chat_concurrency_limiter=chat_concurrency_limiter,
+    embeddings_concurrency_limiter=embeddings_concurrency_limiter,
+    base_url=settings.OPENAI_BASE_URL or None,
+)
+
+summarizer = ChunkSummarizer(
+    client,
+    max_workers=settings.OPENAI_CONCURRENCY_MAX if settings.OPENAI_ADAPTIVE_CONCURRENCY else settings.OPENAI_CONCURRENCY,
+    reduce_prompt=DEFAULT_REDUCE_PROMPT if settings.OPENAI_REDUCE else None,
 )
 
 
 def get_gpt_client() -> ChatGPTClient:
     return client
+
+
+def get_summarizer() -> ChunkSummarizer:
+    return summarizer
+
+
+def get_prompt_manager() -> PromptManager:
+    return manager_prompt
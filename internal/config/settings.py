@@ -1,4 +1,4 @@
-from typing import ClassVar, Optional
+from typing import ClassVar, Literal, Optional
 
 from pydantic import Field, PostgresDsn, field_validator, RedisDsn
 from pydantic_core.core_schema import ValidationInfo
@@ -17,7 +17,15 @@ class Settings(BaseSettings):
     DOCS: str = '/docs'
     STARTUP: str = 'startup'
     SHUTDOWN: str = 'shutdown'
-    COLLECTION_NAME: str = 'pdf_embeddings'
+    COLLECTION_NAME: str = 'pdf_embeddings_v2'
+    EMBEDDINGS_DIMENSION: int = Field(1536, gt=0, description='Dimension of the vectors in COLLECTION_NAME.')
+    MILVUS_NUM_PARTITIONS: int = Field(16, gt=0, description='Partitions the prompt types are hashed into.')
+    FINGERPRINT_COLLECTION_NAME: str = 'pdf_fingerprints'
+    DEDUP_FINGERPRINT: bool = Field(True, description='Look up near-duplicate documents by SimHash before summarization.')
+    DEDUP_FINGERPRINT_MAX_DISTANCE: int = Field(5, ge=0, description='Largest Hamming distance of a near-duplicate.')
+    DEDUP_FINGERPRINT_MIN_FEATURES: int = Field(
+        50, ge=1, description='Shingles a document needs before its fingerprint is looked up or stored.',
+    )
 
     NAME: str = 'Atlas Backend'
     VERSION: str = '0.1.0'
@@ -41,6 +49,32 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = Field(..., description='Minio secret token.')
     # Настройки OpenAI
     OPENAI_TOKEN: str = Field(..., description='OpenAI API Bearer token.')
+    OPENAI_BASE_URL: Optional[str] = Field(None, description='OpenAI-compatible API base URL, None for the OpenAI API.')
+
+    OPENAI_CONCURRENCY: int = Field(4, ge=1, description='Maximum number of concurrent chat requests per document.')
+    OPENAI_ADAPTIVE_CONCURRENCY: bool = Field(True, description='Adapt requests in flight to API latency and errors.')
+    OPENAI_CONCURRENCY_MAX: int = Field(16, ge=1, description='Upper bound of the adaptive concurrency limit.')
+    OPENAI_LATENCY_TARGET: float = Field(10.0, gt=0, description='p95 latency in seconds above which concurrency is cut.')
+    OPENAI_EMBEDDINGS_BATCH_TOKENS: int = Field(100000, ge=1, description='Maximum tokens in one embeddings request.')
+    OPENAI_EMBEDDINGS_BATCH_SIZE: int = Field(256, ge=1, description='Maximum inputs in one embeddings request.')
+    OPENAI_EMBEDDINGS_CONCURRENCY: int = Field(4, ge=1, description='Maximum embeddings requests in flight.')
+    OPENAI_EMBEDDINGS_CACHE_SIZE: int = Field(10000, ge=0, description='Vectors kept in the in-process embedding cache.')
+    OPENAI_EMBEDDINGS_CACHE_BACKEND: Literal['none', 'redis', 'sqlite'] = Field(
+        'redis', description='Persistent tier of the embedding cache.',
+    )
+    OPENAI_EMBEDDINGS_CACHE_PATH: str = Field('embeddings.sqlite3', description='SQLite file for the embedding cache.')
+    OPENAI_EMBEDDINGS_CACHE_TTL: int | None = Field(30 * 24 * 3600, description='Embedding cache TTL in Redis, in seconds.')
+    OPENAI_COMPLETION_CACHE_SIZE: int = Field(2048, ge=0, description='Completions kept in the in-process cache.')
+    OPENAI_COMPLETION_CACHE_TTL: int | None = Field(90 * 24 * 3600, description='Completion cache TTL in seconds.')
+    OPENAI_COMPLETION_CACHE_REDIS: bool = Field(True, description='Share the completion cache between workers via Redis.')
+    OPENAI_REDUCE: bool = Field(False, description='Merge per-chunk results with an extra reduce request.')
+    OPENAI_CHUNK_OVERLAP: int = Field(0, ge=0, description='Maximum tokens repeated between neighbouring chunks.')
+    OPENAI_CHAT_TPM: int = Field(0, ge=0, description='Tokens per minute quota of the chat model, 0 for no limit.')
+    OPENAI_CHAT_RPM: int = Field(0, ge=0, description='Requests per minute quota of the chat model, 0 for no limit.')
+    OPENAI_EMBEDDINGS_TPM: int = Field(0, ge=0, description='Tokens per minute quota of embeddings, 0 for no limit.')
+    OPENAI_EMBEDDINGS_RPM: int = Field(0, ge=0, description='Requests per minute quota of embeddings, 0 for no limit.')
+    OPENAI_RATE_LIMIT_REDIS: bool = Field(True, description='Share the rate limit buckets between workers via Redis.')
+    OPENAI_COMPLETION_TOKENS_ESTIMATE: int = Field(500, ge=0, description='Response tokens reserved per chat request.')
 
     # Настройки Milvus
     MILVUS_HOST: str = Field('127.0.0.1', alias='MILVUS_DOCKER_IP', description='Milvus host for set connection.')
@@ -55,6 +89,21 @@ class Settings(BaseSettings):
     CELERY_RESULT_BACKEND: RedisDsn | str | None = Field(None, description='Celery result backend URL.')
     CELERY_BROKER_URL: RedisDsn | str | None = Field(None, description='Celery broker URL.')
 
+    # Настройки обработки PDF
+    PDF_EXTRACT_PROCESSES: int = Field(
+        1,
+        ge=1,
+        description='Processes for parallel PDF page extraction; needs the solo or threads Celery pool.',
+    )
+    PDF_STREAMING: bool = Field(True, description='Stream extracted pages into the chunker page by page.')
+    PDF_STRIP_BOILERPLATE: bool = Field(True, description='Strip repeated headers, footers and page numbers.')
+    PDF_PAGE_CACHE_SIZE: int = Field(4096, ge=0, description='Number of page records kept in the local page cache.')
+    PDF_PAGE_CACHE_REDIS: bool = Field(False, description='Share the page cache between workers through Redis.')
+    WORKER_SPOOL_MAX_MEMORY: int = Field(
+        8 * 1024 * 1024, ge=0, description='Bytes of a document kept in memory before it is spilled to disk and mapped.',
+    )
+    PDF_PAGE_CACHE_TTL: int | None = Field(7 * 24 * 3600, description='Page cache TTL in Redis, in seconds.')
+
     TELEGRAM_WEBHOOK: str = Field('https://localhost', description='Telegram webhook for send data.')
 
     @field_validator('DB_URI', mode='before')
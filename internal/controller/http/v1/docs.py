@@ -1,14 +1,16 @@
 import uuid
 
-from fastapi import APIRouter, UploadFile, File, Depends, Form
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Depends, Form
 
 from internal.config.modules.minio import get_minio_client
 from internal.config.settings import buckets, MAX_FILE_SIZE
 from internal.dto.celery import TaskRunInfo
-from internal.dto.docs import DocsCreate
+from internal.dto.docs import DocsCreate, DocsRead
 from internal.service.docs import DocsService
 from internal.usecase.utils.responses import HTTP_400_BAD_REQUEST, HTTP_200_OK_REQUEST, DynamicResponse
+from internal.usecase.utils.tools import file_checksum
 from package.minio.main import MinioClient
+from package.celery.tasks import notify_user
 from package.celery.worker import process_document
 
 # Создаем объект Router для маршрутов данного модуля
@@ -32,6 +34,7 @@ router = APIRouter()
     },
     tags=["PDF Upload"])
 async def upload_pdf(
+        background_tasks: BackgroundTasks,
         user_id: str = Form(...),  # user_id приходит из формы
         prompt_type: str = Form(...),
         file: UploadFile = File(...),  #
@@ -44,7 +47,11 @@ async def upload_pdf(
     processing the uploaded document and returns a response with task details or
     an appropriate error message if validation or file upload fails.
 
+    A file whose content was already processed with the same prompt type is answered
+    from the stored result: the user is notified at once and no task is started.
+
     Args:
+        background_tasks (BackgroundTasks): Runs the user notification after the response.
         user_id (str): The ID of the user uploading the file.
         file (UploadFile): An uploaded file object to be validated and processed.
         service (DocsService): A dependency injection providing access to the
@@ -71,6 +78,17 @@ async def upload_pdf(
             detail=f'File size must be less than {MAX_FILE_SIZE / 1024} KB.',
         )
 
+    # Побайтно одинаковый файл с тем же промптом не обрабатывается повторно
+    checksum = file_checksum(file.file)
+    duplicate = await service.get_by_checksum(checksum, prompt_type)
+    if duplicate is not None:
+        background_tasks.add_task(notify_user, user_id, duplicate.s3_briefly)
+        return DynamicResponse.create(
+            status_code=200,
+            detail='Success',
+            description='File has already been processed.',
+            example=DocsRead.model_validate(duplicate).model_dump(mode='json'))
+
     bucket = buckets.get('tmp')
     object_name = f"{uuid.uuid4()}.pdf"
     s3_briefly = f"{bucket}/{object_name}"
@@ -78,6 +96,7 @@ async def upload_pdf(
     doc_data = DocsCreate(
         name=object_name,
         s3_briefly=s3_briefly,
+        checksum=checksum,
     )
     try:
         await service.transaction_to_minio(
@@ -86,7 +105,7 @@ async def upload_pdf(
             bucket=bucket,
             file=file.file,
         )
-        task = process_document.delay(object_name, bucket, user_id, prompt_type)
+        task = process_document.delay(object_name, bucket, user_id, prompt_type, checksum)
         task_info = TaskRunInfo(id=task.id, filename=object_name, filesize=file.size)
         return DynamicResponse.create(
             status_code=200,
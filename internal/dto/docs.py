@@ -23,6 +23,8 @@ class DocsCreate(BaseModel):
     """
     name: str  # Имя файла
     s3_briefly: str  # Путь в хранилище S3
+    checksum: Optional[int] = None  # Хеш содержимого исходного файла
+    prompt_type: Optional[str] = None  # Тип промпта, с которым получен результат
 
     class Config:
         from_attributes = True
@@ -7,8 +7,14 @@ from sqlalchemy.orm import relationship
 
 
 class Docs(TimestampMixin, Base):
+    __table_args__ = (
+        # Поиск готового результата по содержимому исходного файла и типу промпта
+        sa.Index('ix_docs_checksum_prompt_type', 'checksum', 'prompt_type'),
+    )
+
     name = sa.Column(sa.String(255), nullable=True)
     checksum = sa.Column(sa.BigInteger, nullable=True)
+    prompt_type = sa.Column(sa.String(64), nullable=True)
     s3_briefly = sa.Column(sa.String(255), nullable=True)
     milvus_docs = relationship('MilvusDocs', back_populates='docs', uselist=True)
 
@@ -1,4 +1,5 @@
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
+from uuid import UUID
 
 import sqlalchemy as sa
 from sqlalchemy.orm import selectinload
@@ -47,7 +48,31 @@ class DocsService(Service[Docs]):
             raise e  # Перебрасываем исключение
         return instance
 
-    async def create_docs_and_milvus(self, dto: DocsCreate, milvus_ids: list[int]) -> dict[str, Any]:
+    async def get_by_checksum(self, checksum: int, prompt_type: str) -> Optional[Docs]:
+        """
+        Finds the latest processing result of a file with the given content and prompt type.
+
+        Uploaded source files are stored without a prompt type, so only results match.
+
+        Args:
+            checksum (int): The content hash of the source file.
+            prompt_type (str): The prompt type of the request.
+
+        Returns:
+            Optional[Docs]: The stored result, or None if the file was not processed yet.
+        """
+        return await self.session.scalar(
+            sa.select(self.model).filter_by(
+                checksum=checksum, prompt_type=prompt_type, deleted_at=None,
+            ).order_by(self.model.created_at.desc()).limit(1),
+        )
+
+    async def create_docs_and_milvus(
+            self,
+            dto: DocsCreate,
+            milvus_ids: list[int],
+            docs_id: Optional[UUID] = None,
+    ) -> dict[str, Any]:
         """
         Creates a record in the `Docs` table and a related record in the
         `MilvusDocs` table within a single transactional context. All operations
@@ -59,6 +84,8 @@ class DocsService(Service[Docs]):
                 `Docs` model.
             milvus_ids (list[int]): Identifier to associate the `Docs` record with a
                 `MilvusDocs` record.
+            docs_id (Optional[UUID]): The ID of the `Docs` record when it was generated in
+                advance and already stored with the vectors; the database generates one otherwise.
 
         Raises:
             Exception: Any exceptions that occur during execution, resulting in a
@@ -70,6 +97,8 @@ class DocsService(Service[Docs]):
 
         # Создаём запись в таблице Docs
         instance = self.model(**dto.dict())
+        if docs_id is not None:
+            instance.id = docs_id
         self.session.add(instance)
         await self.session.commit()
         instance_set = [
@@ -106,3 +135,42 @@ class MilvusDocsService(Service[MilvusDocs]):
                 milvus_id=milvus_id, **filter_by,
             ).where(*where),
         )
+
+    async def get_scalars(self, milvus_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Collects the scalar fields of vectors for copying them into a collection that stores them.
+
+        Results without a prompt type, stored before it was recorded, get an empty one, so
+        filtered searches never return them.
+
+        Args:
+            milvus_ids (List[int]): Vector IDs in the old collection.
+
+        Returns:
+            Dict[int, Dict[str, Any]]: The prompt type and the document ID of every referenced vector.
+        """
+        rows = await self.session.execute(
+            sa.select(self.model.milvus_id, self.model.docs_id, Docs.prompt_type).join(Docs).where(
+                self.model.milvus_id.in_(milvus_ids),
+            ),
+        )
+        return {
+            milvus_id: {'prompt_type': prompt_type or '', 'docs_id': str(docs_id)}
+            for milvus_id, docs_id, prompt_type in rows
+        }
+
+    async def remap(self, milvus_ids: Dict[int, int]) -> None:
+        """
+        Repoints the records to the copies of their vectors in a new collection.
+
+        Args:
+            milvus_ids (Dict[int, int]): New vector IDs by old vector ID.
+        """
+        table = self.model.__table__
+        await self.session.execute(
+            table.update().where(table.c.milvus_id == sa.bindparam('old_id')).values(
+                milvus_id=sa.bindparam('new_id'),
+            ),
+            [{'old_id': old_id, 'new_id': new_id} for old_id, new_id in milvus_ids.items()],
+        )
+        await self.session.commit()
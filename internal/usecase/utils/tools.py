@@ -1,3 +1,27 @@
+import hashlib
+
+
+def file_checksum(file, chunk_size: int = 1024 * 1024) -> int:
+    """
+    Compute a 64-bit content hash of a file by reading it in chunks, then rewind it.
+
+    The value is signed so that it fits a BigInteger column.
+
+    Args:
+        file: A seekable binary file object.
+        chunk_size (int): The number of bytes read at a time.
+
+    Returns:
+        int: The checksum of the file content.
+    """
+    hasher = hashlib.blake2b(digest_size=8)
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        hasher.update(chunk)
+    file.seek(0)
+    return int.from_bytes(hasher.digest(), 'big', signed=True)
+
+
 def convert_size(size: int, unit: str) -> float:
     """
     Convert a file size from bytes into a human-readable string representation based on the provided
@@ -9,7 +9,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Конфигурация
 MILVUS_HOST = 'localhost'
 MILVUS_PORT = '19530'
-COLLECTION_NAME = 'pdf_embeddings'
+COLLECTION_NAME = 'pdf_embeddings_v2'
 DIMENSION = 1536
 
 
@@ -19,8 +19,8 @@ async def main():
     # result = milvus_client.get_all_vectors(collection_name=COLLECTION_NAME)
     # for item in result:
     #     print(item)
-    milvus_client.drop_collection('pdf_embeddings')
-    milvus_client.create_collection('pdf_embeddings', DIMENSION)
+    milvus_client.drop_collection(COLLECTION_NAME)
+    milvus_client.create_collection(COLLECTION_NAME, DIMENSION)
 
 
 if __name__ == '__main__':
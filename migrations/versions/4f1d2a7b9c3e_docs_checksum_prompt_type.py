@@ -0,0 +1,27 @@
+"""docs checksum and prompt type
+
+Revision ID: 4f1d2a7b9c3e
+Revises: c9309fddd1ae
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1d2a7b9c3e'
+down_revision: Union[str, None] = 'c9309fddd1ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('docs', sa.Column('prompt_type', sa.String(length=64), nullable=True))
+    op.create_index('ix_docs_checksum_prompt_type', 'docs', ['checksum', 'prompt_type'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_docs_checksum_prompt_type', table_name='docs')
+    op.drop_column('docs', 'prompt_type')
@@ -1,85 +1,318 @@
 import uuid
 import asyncio
-from io import BytesIO
+import logging
+from typing import Any, BinaryIO, Generator, Iterable, List, Optional, Tuple
+from uuid import UUID
 
 from markdown_pdf import MarkdownPdf, Section
 from celery import Celery
+from celery.signals import worker_process_init
 
-from internal.config import get_milvus_client, get_gpt_client, get_minio_client
+from internal.config import (
+    get_gpt_client,
+    get_milvus_client,
+    get_minio_client,
+    get_page_cache,
+    get_prompt_manager,
+    get_summarizer,
+)
 from internal.config.settings import settings, buckets
-from internal.dto.docs import DocsCreate, MilvusDocsRead
+from internal.dto.docs import DocsCreate, DocsRead, MilvusDocsRead
 from internal.service.docs import DocsService, MilvusDocsService
 from internal.service.utils import get_service
 from package.celery.tasks import MyTaskWithSuccess
-from package.pdf import PDFProcessor
+from package.pdf import BoilerplateCleaner, PDFProcessor, SimHash, can_spawn_processes, spool_document
 
 celery = Celery(__name__, broker=str(settings.CELERY_BROKER_URL), backend=str(settings.CELERY_RESULT_BACKEND))
 
 minio_client = get_minio_client()
 chatgpt_client = get_gpt_client()
+summarizer = get_summarizer()
+prompt_manager = get_prompt_manager()
 milvus_client = get_milvus_client()
+page_cache = get_page_cache()
 
 
-def process_pdf_and_extract(file_stream: BytesIO, start_page: int = 0):
+@worker_process_init.connect
+def warm_up_milvus(**kwargs):
+    """
+    Load the embeddings collection in every worker process before its first task.
+
+    gRPC channels do not survive fork, so the process connects to Milvus anew.
+    """
+    milvus_client.reconnect()
+    milvus_client.create_collection(
+        settings.COLLECTION_NAME, settings.EMBEDDINGS_DIMENSION, num_partitions=settings.MILVUS_NUM_PARTITIONS,
+    )
+    milvus_client.create_fingerprint_collection(settings.FINGERPRINT_COLLECTION_NAME)
+    milvus_client.warm_up([settings.COLLECTION_NAME, settings.FINGERPRINT_COLLECTION_NAME])
+
+
+@worker_process_init.connect
+def check_extract_processes(**kwargs):
+    """
+    Warn once per worker process when parallel PDF extraction cannot be used in it.
+
+    Prefork pool children are daemonic and cannot start a process pool, so pages are
+    extracted in the task process; use the solo or threads pool for PDF_EXTRACT_PROCESSES > 1.
+    """
+    if settings.PDF_EXTRACT_PROCESSES > 1 and not can_spawn_processes():
+        logging.warning(
+            f'PDF_EXTRACT_PROCESSES={settings.PDF_EXTRACT_PROCESSES} needs the solo or threads pool, '
+            'pages are extracted in the task process.',
+        )
+
+
+def clean_pages(pages: Iterable[str]) -> Generator[str, None, None]:
+    """
+    Strip repeated headers, footers, page numbers and layout noise from page texts.
+
+    Runs between PDFProcessor.extract() and the chunker when PDF_STRIP_BOILERPLATE
+    is enabled and logs how many lines the cleaning removed from the document. The
+    saved tokens are counted only with debug logging, as it tokenizes every page twice.
+
+    Args:
+        pages (Iterable[str]): Page texts in document order.
+
+    Yields:
+        str: Cleaned page texts in the same order.
+    """
+    if not settings.PDF_STRIP_BOILERPLATE:
+        yield from pages
+        return
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    cleaner = BoilerplateCleaner(
+        token_counter=(lambda text: len(chatgpt_client.tokenizer.encode(text))) if debug else None,
+    )
+    yield from cleaner.clean(pages)
+    logging.info(f'Boilerplate stripping removed {cleaner.removed_lines} lines.')
+    if debug:
+        logging.debug(f'Boilerplate stripping saved {cleaner.tokens_saved} of {cleaner.tokens_before} tokens.')
+
+
+def process_pdf_and_extract(file_stream: BinaryIO, start_page: int = 0, processes: int = settings.PDF_EXTRACT_PROCESSES):
     """
     Process a PDF file and extract text.
 
     This function utilizes a PDF processing utility to extract text from a given
     PDF file stream. It initializes a PDFProcessor object with the provided file
     stream, processes the PDF starting from the specified page, and extracts the
-    text content from all processed pages. The extracted text is returned as a
-    single concatenated string with line breaks.
+    text content from all processed pages. Page texts are cleaned of repeated
+    boilerplate and returned as a single concatenated string with line breaks.
 
     Args:
-        file_stream (BytesIO): A binary stream representing the PDF file.
+        file_stream (BinaryIO): A binary stream representing the PDF file.
         start_page (int): The page number to start processing the PDF from. Defaults
             to 0.
+        processes (int): The number of processes the page range is split across.
+            Defaults to the PDF_EXTRACT_PROCESSES setting.
 
     Returns:
         str: The extracted text from the PDF, concatenated with line breaks.
+
+    Raises:
+        ScannedDocumentError: If the PDF has no text layer at all.
+    """
+    with PDFProcessor(file_stream, page_cache=page_cache) as pdf_processor:
+        pdf_processor.ensure_text_layer(start_page=start_page)
+        pdf_processor.process_pdf(start_page=start_page, end_page=pdf_processor.pages, processes=processes)
+        return '\n'.join(clean_pages(pdf_processor.extract()))
+
+
+def stream_pdf_chunks(file_stream: BinaryIO, chunk_size: int, start_page: int = 0) -> Generator[str, None, None]:
+    """
+    Stream text chunks of a PDF file while its pages are still being parsed.
+
+    Pages are extracted one by one and fed straight into the chunker, so the first
+    chunk is available after the first few pages and the whole document text is
+    never held in memory at once.
+
+    Args:
+        file_stream (BinaryIO): A binary stream representing the PDF file.
+        chunk_size (int): The number of tokens each chunk should contain.
+        start_page (int): The page number to start processing the PDF from. Defaults
+            to 0.
+
+    Yields:
+        str: Text chunks of the document in order.
+
+    Raises:
+        ScannedDocumentError: If the PDF has no text layer at all.
+    """
+    with PDFProcessor(file_stream, page_cache=page_cache) as pdf_processor:
+        pdf_processor.ensure_text_layer(start_page=start_page)
+        yield from chatgpt_client.stream_text_into_chunks(
+            clean_pages(pdf_processor.stream_extract(start_page=start_page)),
+            chunk_size=chunk_size,
+        )
+
+
+def extract_chunks(file_stream: BinaryIO) -> Iterable[str]:
+    """
+    Choose the extraction mode from settings and return the document chunks.
+
+    Parallel extraction needs the whole page range at once, so streaming is only
+    used when a single extraction process is configured or a process pool cannot
+    be started in this process.
+
+    Args:
+        file_stream (BinaryIO): A binary stream representing the PDF file.
+
+    Returns:
+        Iterable[str]: Text chunks of the document, lazily produced in streaming mode.
+    """
+    if settings.PDF_STREAMING and (settings.PDF_EXTRACT_PROCESSES == 1 or not can_spawn_processes()):
+        return stream_pdf_chunks(file_stream, chunk_size=chatgpt_client.max_tokens)
+    long_text = process_pdf_and_extract(file_stream)
+    return chatgpt_client.split_text_into_chunks(long_text, chunk_size=chatgpt_client.max_tokens)
+
+
+def embedding_filters(prompt_type: Optional[str]) -> dict:
+    """
+    Return the scalar fields a stored vector must match to be reused for a request.
+
+    Vectors of other prompt types or of another embeddings model never match.
+
+    Args:
+        prompt_type (Optional[str]): The prompt type of the request.
+
+    Returns:
+        dict: Field values for filtered search and for inserts.
+    """
+    return {'prompt_type': prompt_type or '', 'model': chatgpt_client.embeddings_model_name}
+
+
+def find_duplicate(fingerprint: bytes, prompt_type: str) -> Optional[dict]:
+    """
+    Look up an already processed near-duplicate of a document by its fingerprint.
+
+    Args:
+        fingerprint (bytes): SimHash of the document chunks.
+        prompt_type (str): The prompt type of the request; results of other prompts never match.
+
+    Returns:
+        Optional[dict]: The stored Docs record of the closest duplicate, or None.
+    """
+    matches = milvus_client.search_fingerprint(
+        settings.FINGERPRINT_COLLECTION_NAME,
+        fingerprint,
+        prompt_type,
+        max_distance=settings.DEDUP_FINGERPRINT_MAX_DISTANCE,
+    )
+    for match in matches:
+        result = asyncio.run(__get_docs(match['docs_id']))
+        if result is not None:
+            logging.info(f'Fingerprint duplicate of {match["docs_id"]} at distance {match["distance"]}.')
+            return result
+    return None
+
+
+def fingerprint_chunks(chunks: Iterable[str], simhash: SimHash) -> Generator[str, None, None]:
+    """
+    Pass chunks through unchanged while adding each of them to a SimHash.
+
+    Lets a streamed document be fingerprinted while its chunks are being embedded,
+    so deduplication does not need the whole chunk list in memory up front.
+
+    Args:
+        chunks (Iterable[str]): Text chunks of the document in order.
+        simhash (SimHash): The fingerprint the chunks are added to.
+
+    Yields:
+        str: The same chunks in the same order.
     """
-    pdf_processor = PDFProcessor(file_stream)
-    pdf_processor.process_pdf(start_page=start_page, end_page=pdf_processor.pages)
-    return '\n'.join(pdf_processor.extract())
+    for chunk in chunks:
+        simhash.update(chunk)
+        yield chunk
 
 
-def handle_embeddings_and_texts(chunks: list, collection_name: str, prompt_type: str):
+def lookup_fingerprint(simhash: SimHash, prompt_type: str) -> Tuple[Optional[bytes], Optional[dict]]:
     """
-    Handles the embedding creation from chunks, searches for matching vectors in
-    Milvus storage, and processes text data from the input chunks if no sufficient
-    match is found.
+    Finish a document fingerprint and look up an already processed near-duplicate.
 
-    Combines the functionality of generating embeddings with the external API,
-    querying the vector database for relevant matches, validating match thresholds,
-    and generating fallback or additional results for unmatched embeddings and texts.
+    Args:
+        simhash (SimHash): SimHash of all chunks of the document.
+        prompt_type (str): The prompt type of the request.
+
+    Returns:
+        Tuple[Optional[bytes], Optional[dict]]: The fingerprint, or None when the document
+        is too short to be fingerprinted reliably, and the Docs record of the duplicate, if any.
+    """
+    # У коротких документов слишком мало шинглов, их отпечатки совпадают случайно
+    if simhash.features < settings.DEDUP_FINGERPRINT_MIN_FEATURES:
+        return None, None
+    fingerprint = simhash.digest()
+    return fingerprint, find_duplicate(fingerprint, prompt_type)
+
+
+def embed_and_search(
+        chunks: Iterable[str],
+        collection_name: str,
+        prompt_type: str,
+) -> Tuple[List[str], List[Any], list]:
+    """
+    Creates the embeddings of the chunks and searches Milvus for a matching stored vector.
 
     Parameters:
-        chunks (list): A list of input text chunks to process for embedding and text
-        handling.
+        chunks (Iterable[str]): Input text chunks to embed. A generator is consumed lazily,
+        embedding request-sized batches as they fill up.
 
         collection_name (str): The name of the embedding collection in the Milvus
         database to perform the vector search.
 
         prompt_type (str): The type of the prompt to be used when generating embeddings.
+        Only vectors stored for the same prompt type and embeddings model are searched.
 
     Returns:
-        Tuple: A tuple containing the generated embedding, search results from the
-        Milvus database, and optionally, a tuple of new embeddings and concatenated
-        processed text if no sufficient match is found.
-    """
-    if prompt_type is not None:
-        chatgpt_client.system_prompt = prompt_type
-    embedding = chatgpt_client.create_embeddings(chunks)
-    results = milvus_client.search_vectors(collection_name, query_vector=embedding, limit=1)
-    if results and results[0]['distance'] >= 0.9:
-        return embedding, results, None
-    new_embeddings = [embedding]
-    texts = ''.join(chatgpt_client.send_message(chunk) for chunk in chunks)
-    return embedding, results, (new_embeddings, texts)
+        Tuple: The chunks as a list, their embeddings and the search results from Milvus.
+    """
+    if isinstance(chunks, list):
+        embedding = chatgpt_client.create_embeddings(chunks)
+    else:
+        # Чанки собираются в пакеты по бюджету токенов и отправляются, пока извлечение продолжается
+        chunks, embedding = chatgpt_client.create_embeddings_stream(chunks)
+    results = milvus_client.search_vectors(
+        collection_name, query_vector=embedding, limit=1, filters=embedding_filters(prompt_type),
+    )
+    return chunks, embedding, results
+
+
+def summarize_chunks(chunks: List[str], prompt_type: str) -> str:
+    """
+    Summarizes the chunks with the prompt of the request.
+
+    Args:
+        chunks (List[str]): Text chunks of the document in order.
+        prompt_type (str): The type of the prompt used for summarization.
+
+    Returns:
+        str: The summaries of the chunks joined in document order.
+    """
+    # Каждый документ получает собственную сессию, общий клиент не изменяется
+    session = chatgpt_client.session(prompt_manager.get_prompt(prompt_type) if prompt_type is not None else None)
+    # Чанки отправляются параллельно, порядок результатов сохраняется
+    return summarizer.summarize(chunks, session)
+
+
+def record_checksum(docs: dict, checksum: Optional[int], prompt_type: str) -> None:
+    """
+    Store the checksum of an upload answered with an existing result.
+
+    The new Docs record points at the reused result, so a byte-identical re-upload
+    with the same prompt type is answered by DocsService.get_by_checksum without a task.
+
+    Args:
+        docs (dict): The reused Docs record.
+        checksum (Optional[int]): Content hash of the uploaded file; nothing is stored without it.
+        prompt_type (str): The prompt type of the request.
+    """
+    if checksum is None:
+        return
+    asyncio.run(__create_docs(docs['name'], docs['s3_briefly'], checksum, prompt_type))
 
 
 @celery.task(base=MyTaskWithSuccess, name='process_document')
-def process_document(filename: str, bucket: str, user_id: str, prompt_type: str):
+def process_document(filename: str, bucket: str, user_id: str, prompt_type: str, checksum: Optional[int] = None):
     """
     Asynchronous task for processing a document file stored in a MinIO bucket. The task includes
     retrieval of the file, processing it to extract text, preparing embeddings for the text chunks,
@@ -91,6 +324,8 @@ def process_document(filename: str, bucket: str, user_id: str, prompt_type: str)
         bucket (str): Name of the MinIO bucket where the file is stored.
         user_id (str): ID of the user processing the document.
         prompt_type (str): Type of the prompt for the user to prompt.
+        checksum (Optional[int]): Content hash of the uploaded file, stored with the result
+            so that identical uploads are answered without a task.
 
     Returns:
         dict: A dictionary representing the result created in the Milvus database.
@@ -99,32 +334,61 @@ def process_document(filename: str, bucket: str, user_id: str, prompt_type: str)
         KeyError: Raised in case of unexpected missing buckets during operations.
         StorageException: Raised on failure to interact with MinIO client.
         ProcessingException: Raised for any issues in text processing or PDF creation.
+        ScannedDocumentError: Raised before any LLM call when the PDF has no text layer.
         DatabaseException: Raised for errors occurring during interactions with Milvus.
     """
-    file, _ = minio_client.get_file_from_bucket(bucket_name=bucket, object_name=filename)
-    file_stream = BytesIO(file)
+    # Файл пишется во временный буфер и при превышении бюджета памяти отображается с диска
+    file_chunks = minio_client.stream_file_from_bucket(bucket_name=bucket, object_name=filename)
+    with spool_document(file_chunks, max_memory=settings.WORKER_SPOOL_MAX_MEMORY) as file_stream:
+        # Обработка PDF и разбивка текста на чанки
+        chunks = extract_chunks(file_stream)
 
-    # Обработка PDF
-    long_text = process_pdf_and_extract(file_stream)
+        # Почти полный дубликат находится по отпечатку чанков, до суммаризации
+        fingerprint = None
+        simhash = None
+        if settings.DEDUP_FINGERPRINT:
+            if isinstance(chunks, list):
+                # Чанки уже в памяти, поэтому дубликат ищется ещё до эмбеддингов
+                fingerprint, duplicate = lookup_fingerprint(SimHash.of(chunks), prompt_type)
+                if duplicate is not None:
+                    record_checksum(duplicate, checksum, prompt_type)
+                    return duplicate, user_id, duplicate['s3_briefly']
+            else:
+                # Отпечаток собирается по ходу потока и не задерживает эмбеддинги
+                simhash = SimHash()
+                chunks = fingerprint_chunks(chunks, simhash)
 
-    # Разбивка текста на чанки
-    chunks = chatgpt_client.split_text_into_chunks(long_text, chunk_size=chatgpt_client.max_tokens)
+        # Работа с эмбеддингами
+        chunks, embedding, results = embed_and_search(chunks, settings.COLLECTION_NAME, prompt_type)
+    if simhash is not None:
+        fingerprint, duplicate = lookup_fingerprint(simhash, prompt_type)
+        if duplicate is not None:
+            record_checksum(duplicate, checksum, prompt_type)
+            return duplicate, user_id, duplicate['s3_briefly']
+    for name, stats in chatgpt_client.metrics().items():
+        if name.endswith('_concurrency'):
+            logging.info(f'{name}: limit {stats["limit"]}, p95 {stats["p95_latency"]}, changes {stats["changes"]}')
 
-    # Работа с эмбеддингами и текстами
-    embedding, results, embeddings_and_texts = handle_embeddings_and_texts(
-        chunks,
-        settings.COLLECTION_NAME,
-        prompt_type)
-
-    if embeddings_and_texts is None:
+    if results and results[0]['distance'] >= 0.9:
         for milvus_object in results:
             result = asyncio.run(__get_docs_milvus(milvus_object['id']))
             if result is None:
                 continue
+            if fingerprint is not None:
+                milvus_client.insert_fingerprint(
+                    settings.FINGERPRINT_COLLECTION_NAME, fingerprint, str(result['docs_id']), prompt_type,
+                )
+            record_checksum(result['docs'], checksum, prompt_type)
             return result, user_id, result['docs']['s3_briefly']
 
-    new_embeddings, texts = embeddings_and_texts
-    ids = milvus_client.insert_vectors(settings.COLLECTION_NAME, new_embeddings)
+    texts = summarize_chunks(chunks, prompt_type)
+    # ID результата генерируется заранее, чтобы сохранить его вместе с векторами
+    docs_id = uuid.uuid4()
+    ids = milvus_client.insert_vectors(
+        settings.COLLECTION_NAME,
+        embedding,
+        scalars={**embedding_filters(prompt_type), 'docs_id': str(docs_id)},
+    )
 
     # Генерация PDF и загрузка в MinIO
     pdf = MarkdownPdf(toc_level=3)
@@ -134,7 +398,9 @@ def process_document(filename: str, bucket: str, user_id: str, prompt_type: str)
     object_name = f"{uuid.uuid4()}.pdf"
     new_bucket = buckets.get('pdf')
     minio_client.upload_file_to_bucket(file_io=pdf.out_file, bucket_name=new_bucket, object_name=object_name)
-    result = asyncio.run(__create_docs_milvus(ids, object_name, new_bucket))
+    result = asyncio.run(__create_docs_milvus(ids, object_name, new_bucket, checksum, prompt_type, docs_id))
+    if fingerprint is not None:
+        milvus_client.insert_fingerprint(settings.FINGERPRINT_COLLECTION_NAME, fingerprint, str(result['id']), prompt_type)
     return result, user_id, result['s3_briefly']
 
 
@@ -142,18 +408,37 @@ async def __create_docs_milvus(
         milvus_ids: list[int],
         doc_name: str,
         bucket: str,
+        checksum: Optional[int] = None,
+        prompt_type: Optional[str] = None,
+        docs_id: Optional[UUID] = None,
 ):
     async with get_service(DocsService) as docs_service:
         s3_briefly = f"{bucket}/{doc_name}"
         dto_doc = DocsCreate(
             name=doc_name,
             s3_briefly=s3_briefly,
+            checksum=checksum,
+            prompt_type=prompt_type,
         )
-        result = await docs_service.create_docs_and_milvus(dto_doc, milvus_ids)
+        result = await docs_service.create_docs_and_milvus(dto_doc, milvus_ids, docs_id)
         return result
 
 
+async def __create_docs(name: str, s3_briefly: str, checksum: int, prompt_type: Optional[str]):
+    async with get_service(DocsService) as docs_service:
+        dto_doc = DocsCreate(name=name, s3_briefly=s3_briefly, checksum=checksum, prompt_type=prompt_type)
+        return await docs_service.create(dto_doc)
+
+
 async def __get_docs_milvus(milvus_id: int):
     async with get_service(MilvusDocsService) as milvus_docs_service:
         result = await milvus_docs_service.get_one_or_none(milvus_id)
         return MilvusDocsRead.model_validate(result).model_dump()
+
+
+async def __get_docs(docs_id: str):
+    async with get_service(DocsService) as docs_service:
+        result = await docs_service.get_one_or_none(UUID(docs_id))
+        if result is None:
+            return None
+        return DocsRead.model_validate(result).model_dump()
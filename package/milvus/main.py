@@ -1,10 +1,15 @@
+import json
 import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Generator, Iterable, List, Optional, Sequence, Union
 
 from pymilvus import (
     Collection,
     CollectionSchema,
     DataType,
     FieldSchema,
+    MilvusException,
     connections,
     has_collection,
 )
@@ -22,6 +27,8 @@ class MilvusClient:
         self.host = host
         self.port = port
         self.connection_alias = 'default'
+        self._collections: Dict[str, Collection] = {}
+        self._collections_lock = threading.Lock()
         self._connect()
 
     def _connect(self):
@@ -30,23 +37,95 @@ class MilvusClient:
         """
         connections.connect(alias=self.connection_alias, host=self.host, port=self.port)
 
-    def create_collection(self, collection_name: str, dim: int, metric_type: str = 'COSINE'):
+    def reconnect(self):
+        """
+        Re-establish the connection and drop cached handles, for example in a forked worker process.
+        """
+        with self._collections_lock:
+            self._collections.clear()
+        connections.disconnect(self.connection_alias)
+        self._connect()
+
+    def get_collection(self, collection_name: str) -> Collection:
+        """
+        Return a loaded handle of a collection, creating and loading it only on first use.
+
+        Handles are kept for the life of the process, so the load round-trip is not paid
+        on every request.
+
+        Args:
+            collection_name (str): The name of the collection.
+
+        Returns:
+            Collection: The loaded collection handle.
+        """
+        collection = self._collections.get(collection_name)
+        if collection is not None:
+            return collection
+        with self._collections_lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                collection = Collection(collection_name, using=self.connection_alias)
+                collection.load()
+                self._collections[collection_name] = collection
+                logging.info(f'Collection {collection_name} loaded.')
+        return collection
+
+    def refresh_collection(self, collection_name: str) -> None:
+        """
+        Drop the cached handle of a collection after its schema or index has changed.
+
+        Args:
+            collection_name (str): The name of the collection.
+        """
+        with self._collections_lock:
+            self._collections.pop(collection_name, None)
+
+    def warm_up(self, collection_names: Iterable[str]) -> None:
+        """
+        Load the collections a process will use, so the first document does not wait for it.
+
+        Missing collections are skipped.
+
+        Args:
+            collection_names (Iterable[str]): Names of the collections.
+        """
+        for collection_name in collection_names:
+            if has_collection(collection_name, using=self.connection_alias):
+                self.get_collection(collection_name)
+            else:
+                logging.warning(f'Collection {collection_name} does not exist, warm-up skipped.')
+
+    def create_collection(self, collection_name: str, dim: int, metric_type: str = 'COSINE', num_partitions: int = 16):
         """
         Create a collection in Milvus if it does not already exist.
 
+        Every vector carries the prompt type, the embeddings model and the document ID.
+        The prompt type is the partition key, so a search filtered by it only scans the
+        partition of that prompt type.
+
         Args:
             collection_name (str): The name of the collection.
             dim (int): The dimensionality of the vectors.
             metric_type (str): The distance metric type (COSINE, L2, etc.).
+            num_partitions (int): The number of partitions the prompt types are hashed into.
         """
         # Проверка, существует ли коллекция
-        if not has_collection(collection_name):
+        if not has_collection(collection_name, using=self.connection_alias):
             fields = [
                 FieldSchema(name='id', dtype=DataType.INT64, is_primary=True, auto_id=True),
                 FieldSchema(name='vector', dtype=DataType.FLOAT_VECTOR, dim=dim),
+                FieldSchema(name='prompt_type', dtype=DataType.VARCHAR, max_length=64, is_partition_key=True),
+                FieldSchema(name='model', dtype=DataType.VARCHAR, max_length=128),
+                FieldSchema(name='docs_id', dtype=DataType.VARCHAR, max_length=36),
             ]
             schema = CollectionSchema(fields, description=f'Collection for {collection_name}')
-            collection = Collection(name=collection_name, schema=schema)
+            collection = Collection(
+                name=collection_name,
+                schema=schema,
+                using=self.connection_alias,
+                num_partitions=num_partitions,
+            )
 
             # Создаем индекс для коллекции
             index_params = {
@@ -55,28 +134,181 @@ class MilvusClient:
                 'params': {'M': 32, 'efConstruction': 400},
             }
             collection.create_index(field_name='vector', index_params=index_params)
+            self.refresh_collection(collection_name)
             logging.info(f'Коллекция {collection_name} успешно создана.')
         else:
             logging.info(f'Коллекция {collection_name} уже существует.')
 
-    def insert_vectors(self, collection_name: str, vectors: list[list[float]]) -> list[int]:
+    def create_fingerprint_collection(self, collection_name: str, bits: int = 64):
+        """
+        Create a collection of document fingerprints if it does not already exist.
+
+        Fingerprints are binary vectors searched by Hamming distance, stored with the
+        document ID and the prompt type the document was processed with.
+
+        Args:
+            collection_name (str): The name of the collection.
+            bits (int): The fingerprint length in bits, a multiple of 8.
+        """
+        if has_collection(collection_name, using=self.connection_alias):
+            return
+        fields = [
+            FieldSchema(name='id', dtype=DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema(name='fingerprint', dtype=DataType.BINARY_VECTOR, dim=bits),
+            FieldSchema(name='docs_id', dtype=DataType.VARCHAR, max_length=36),
+            FieldSchema(name='prompt_type', dtype=DataType.VARCHAR, max_length=64),
+        ]
+        schema = CollectionSchema(fields, description=f'Document fingerprints for {collection_name}')
+        collection = Collection(name=collection_name, schema=schema, using=self.connection_alias)
+        collection.create_index(
+            field_name='fingerprint',
+            index_params={'index_type': 'BIN_FLAT', 'metric_type': 'HAMMING', 'params': {}},
+        )
+        self.refresh_collection(collection_name)
+        logging.info(f'Collection {collection_name} created.')
+
+    def insert_fingerprint(self, collection_name: str, fingerprint: bytes, docs_id: str, prompt_type: str) -> int:
+        """
+        Store the fingerprint of a processed document.
+
+        Args:
+            collection_name (str): The name of the fingerprint collection.
+            fingerprint (bytes): The document fingerprint.
+            docs_id (str): The ID of the Docs record holding the result.
+            prompt_type (str): The prompt type the document was processed with.
+
+        Returns:
+            int: The generated ID.
+        """
+        collection = self.get_collection(collection_name)
+        mutation_result = collection.insert([[fingerprint], [docs_id], [prompt_type]])
+        return mutation_result.primary_keys[0]
+
+    def search_fingerprint(
+            self,
+            collection_name: str,
+            fingerprint: bytes,
+            prompt_type: str,
+            max_distance: int,
+    ) -> list[dict]:
+        """
+        Find documents with a fingerprint within max_distance bits, closest first.
+
+        Args:
+            collection_name (str): The name of the fingerprint collection.
+            fingerprint (bytes): The fingerprint of the new document.
+            prompt_type (str): Only documents processed with this prompt type are returned.
+            max_distance (int): The largest Hamming distance of a near-duplicate.
+
+        Returns:
+            list[dict]: Matches with IDs, distances and document IDs.
+        """
+        results = self.get_collection(collection_name).search(
+            data=[fingerprint],
+            anns_field='fingerprint',
+            param={'metric_type': 'HAMMING', 'params': {}},
+            limit=3,
+            expr=f'prompt_type == {json.dumps(prompt_type)}',
+            output_fields=['docs_id'],
+        )
+        return [
+            {'id': hit.id, 'distance': hit.distance, 'docs_id': hit.entity.get('docs_id')}
+            for hits in results for hit in hits if hit.distance <= max_distance
+        ]
+
+    def insert_vectors(
+            self,
+            collection_name: str,
+            vectors: list[list[float]],
+            scalars: Optional[Dict[str, Any]] = None,
+    ) -> list[int]:
         """
         Insert vectors into a collection with auto-incremented IDs.
 
         Args:
             collection_name (str): The name of the collection.
             vectors (list[list[float]]): List of vectors to insert.
+            scalars (Optional[Dict[str, Any]]): Scalar field values shared by all the vectors,
+                for example the prompt type, the model and the document ID.
         """
-        collection = Collection(collection_name)
+        collection = self.get_collection(collection_name)
 
-        mutation_result = collection.insert(vectors)
+        mutation_result = collection.insert(self._rows(vectors, scalars))
 
         generated_ids = mutation_result.primary_keys
 
         logging.info(f'Inserted {len(vectors)} vectors into collection {collection_name}')
         return generated_ids
 
-    def search_vectors(self, collection_name: str, query_vector: list[list[float]], limit: int = 5):
+    def insert_stream(
+            self,
+            collection_name: str,
+            vectors: Iterable[Union[Sequence[float], Dict[str, Any]]],
+            batch_size: int = 1000,
+            max_batch_bytes: int = 32 * 1024 * 1024,
+            max_in_flight: int = 2,
+            flush: bool = True,
+            scalars: Optional[Dict[str, Any]] = None,
+    ) -> List[int]:
+        """
+        Insert a stream of vectors in bounded batches with a few requests in flight.
+
+        Vectors are consumed lazily, so only the batches in flight are held in memory.
+        Batches are limited both by the number of vectors and by their size, which keeps
+        each request under the gRPC message limit. The collection is flushed once at the end.
+
+        Args:
+            collection_name (str): The name of the collection.
+            vectors (Iterable[Union[Sequence[float], Dict[str, Any]]]): Vectors to insert, consumed once,
+                or whole rows with a vector key and their own scalar fields.
+            batch_size (int): The maximum number of vectors in one request.
+            max_batch_bytes (int): The maximum size of the vectors in one request.
+            max_in_flight (int): The maximum number of insert requests awaiting a reply.
+            flush (bool): Whether to flush the collection after the last batch.
+            scalars (Optional[Dict[str, Any]]): Scalar field values shared by all the vectors.
+
+        Returns:
+            list[int]: Generated IDs in the order of the input vectors.
+        """
+        collection = self.get_collection(collection_name)
+        generated_ids: List[int] = []
+        pending: Deque = deque()
+        batches = 0
+
+        def send(batch: List[Union[Sequence[float], Dict[str, Any]]]) -> None:
+            nonlocal batches
+            batches += 1
+            if len(pending) >= max_in_flight:
+                generated_ids.extend(pending.popleft().result().primary_keys)
+            pending.append(collection.insert(self._rows(batch, scalars), _async=True))
+
+        batch: List[Union[Sequence[float], Dict[str, Any]]] = []
+        batch_bytes = 0
+        for vector in vectors:
+            # float32 — 4 байта на компоненту
+            vector_bytes = len(vector['vector'] if isinstance(vector, dict) else vector) * 4
+            if batch and (len(batch) >= batch_size or batch_bytes + vector_bytes > max_batch_bytes):
+                send(batch)
+                batch = []
+                batch_bytes = 0
+            batch.append(vector)
+            batch_bytes += vector_bytes
+        if batch:
+            send(batch)
+        while pending:
+            generated_ids.extend(pending.popleft().result().primary_keys)
+        if flush and generated_ids:
+            collection.flush()
+        logging.info(f'Inserted {len(generated_ids)} vectors in {batches} batches into collection {collection_name}')
+        return generated_ids
+
+    def search_vectors(
+            self,
+            collection_name: str,
+            query_vector: list[list[float]],
+            limit: int = 5,
+            filters: Optional[Dict[str, Any]] = None,
+    ):
         """
         Search for similar vectors in a collection.
 
@@ -84,26 +316,138 @@ class MilvusClient:
             collection_name (str): The name of the collection.
             query_vector: list((list[float])): The vector to search for.
             limit (int): The number of top results to return.
+            filters (Optional[Dict[str, Any]]): Scalar field values the results must have.
+                A filter on the partition key restricts the search to one partition.
 
         Returns:
             list[dict]: List of search results with IDs and distances.
         """
-        collection = Collection(collection_name)
-        collection.load()
         search_params = {'metric_type': 'COSINE', 'params': {'ef': 50}}
-        results = collection.search(
-            data=query_vector,
-            anns_field='vector',
-            param=search_params,
-            limit=limit,
-            output_fields=['id'],
-        )
+
+        def search(collection: Collection):
+            return collection.search(
+                data=query_vector,
+                anns_field='vector',
+                param=search_params,
+                limit=limit,
+                expr=self._filter_expr(filters),
+                output_fields=['id'],
+            )
+
+        try:
+            results = search(self.get_collection(collection_name))
+        except MilvusException:
+            # Коллекция могла быть пересоздана или выгружена другим процессом
+            self.refresh_collection(collection_name)
+            results = search(self.get_collection(collection_name))
         output = [
             {'id': hit.id, 'distance': hit.distance} for hits in results for hit in hits
         ]
         logging.info(f'Search completed. Found {len(output)} results.')
         return output
 
+    def migrate_collection(
+            self,
+            source_name: str,
+            target_name: str,
+            dim: int,
+            resolve: Callable[[List[int]], Dict[int, Dict[str, Any]]],
+            batch_size: int = 1000,
+            num_partitions: int = 16,
+    ) -> Generator[Dict[int, int], None, None]:
+        """
+        Copy the vectors of a collection without scalar fields into a collection with them.
+
+        The source is read in batches; resolve returns the scalar fields, including
+        docs_id, of the IDs it knows, and vectors it does not know are skipped. Copies
+        are written with insert_stream and get new IDs, so every group of documents
+        yields the mapping of old IDs to new ones, and the caller must repoint its
+        references before asking for the next group.
+
+        Vectors of one document were inserted by one request and have adjacent IDs, so
+        a document that continues into the next source batch is held back and copied
+        as a whole. Before a group is copied, target rows of its documents are deleted:
+        their old IDs are still referenced, so such rows are leftovers of an interrupted
+        run and the migration can be rerun without duplicates.
+
+        Args:
+            source_name (str): The name of the collection to copy from.
+            target_name (str): The name of the collection to copy into, created if missing.
+            dim (int): The dimensionality of the vectors.
+            resolve (Callable[[List[int]], Dict[int, Dict[str, Any]]]): Maps old IDs to scalar field values.
+            batch_size (int): The number of vectors read and inserted at once.
+            num_partitions (int): The number of partitions of a newly created target.
+
+        Yields:
+            Dict[int, int]: New IDs by old ID for every copied group of documents.
+        """
+        self.create_collection(target_name, dim, num_partitions=num_partitions)
+        target = self.get_collection(target_name)
+        iterator = self.get_collection(source_name).query_iterator(
+            batch_size=batch_size, expr='id != 0', output_fields=['id', 'vector'],
+        )
+        copied = 0
+        skipped = 0
+
+        def copy(rows: List[Dict[str, Any]]) -> Dict[int, int]:
+            nonlocal copied
+            docs_ids = sorted({row['docs_id'] for row in rows})
+            target.delete(f'docs_id in {json.dumps(docs_ids)}')
+            new_ids = self.insert_stream(
+                target_name,
+                ({name: value for name, value in row.items() if name != 'id'} for row in rows),
+                batch_size=batch_size,
+                flush=False,
+            )
+            copied += len(new_ids)
+            return dict(zip((row['id'] for row in rows), new_ids))
+
+        held: List[Dict[str, Any]] = []
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                scalars = resolve([row['id'] for row in rows])
+                skipped += sum(row['id'] not in scalars for row in rows)
+                held.extend(
+                    {'id': row['id'], 'vector': row['vector'], **scalars[row['id']]}
+                    for row in rows if row['id'] in scalars
+                )
+                if not held:
+                    continue
+                # Последний документ пакета может продолжиться в следующем пакете
+                split = len(held)
+                while split > 0 and held[split - 1]['docs_id'] == held[-1]['docs_id']:
+                    split -= 1
+                if split:
+                    ready, held = held[:split], held[split:]
+                    yield copy(ready)
+            if held:
+                yield copy(held)
+        finally:
+            iterator.close()
+            if copied:
+                target.flush()
+            logging.info(f'Copied {copied} vectors from collection {source_name} into {target_name}, skipped {skipped}.')
+
+    @staticmethod
+    def _rows(
+            vectors: Iterable[Union[Sequence[float], Dict[str, Any]]],
+            scalars: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        return [
+            {**(scalars or {}), **vector} if isinstance(vector, dict) else {'vector': vector, **(scalars or {})}
+            for vector in vectors
+        ]
+
+    @staticmethod
+    def _filter_expr(filters: Optional[Dict[str, Any]]) -> Optional[str]:
+        # json.dumps экранирует кавычки в строковых значениях
+        if not filters:
+            return None
+        return ' and '.join(f'{name} == {json.dumps(value)}' for name, value in filters.items())
+
     def delete_vector(self, collection_name: str, vector_id: int):
         """
         Delete a vector from a collection by its ID.
@@ -112,7 +456,7 @@ class MilvusClient:
             collection_name (str): The name of the collection.
             vector_id (int): The ID of the vector to delete.
         """
-        collection = Collection(collection_name)
+        collection = self.get_collection(collection_name)
         expr = f'id == {vector_id}'
         collection.delete(expr)
         logging.info(f'Vector with ID {vector_id} deleted from collection {collection_name}')
@@ -124,7 +468,8 @@ class MilvusClient:
         Args:
             collection_name (str): The name of the collection.
         """
-        collection = Collection(collection_name)
+        self.refresh_collection(collection_name)
+        collection = Collection(collection_name, using=self.connection_alias)
         collection.drop()
         logging.info(f'Collection {collection_name} dropped.')
 
@@ -138,11 +483,10 @@ class MilvusClient:
         Returns:
             list[dict]: Список всех векторов с их ID.
         """
-        collection = Collection(collection_name)
-        collection.load()
+        collection = self.get_collection(collection_name)
 
         # Запрашиваем все данные из коллекции
-        results = collection.query(expr='id != 0', output_fields=['id', 'vector'], liimit=100)
+        results = collection.query(expr='id != 0', output_fields=['id', 'vector'], limit=100)
 
         logging.info(f'Получено {len(results)} записей из коллекции {collection_name}')
         return results
@@ -1,4 +1,6 @@
 import logging
+from typing import Generator
+
 from urllib3 import PoolManager
 from minio import Minio
 
@@ -117,3 +119,26 @@ class MinioClient(object):
 
         logging.info(f'Get file: {object_name} to bucket: {bucket_name}')
         return file_data, url
+
+    def stream_file_from_bucket(
+            self, bucket_name: str, object_name: str, chunk_size: int = 1024 * 1024,
+    ) -> Generator[bytes, None, None]:
+        """
+        Streams a file from a specified bucket in chunks without holding it in memory.
+
+        Args:
+            bucket_name (str): The name of the bucket from which to download the file.
+            object_name (str): The name of the object to download.
+            chunk_size (int): The size of each yielded chunk in bytes.
+
+        Yields:
+            bytes: Consecutive parts of the object content.
+        """
+        response = self.connection.get_object(bucket_name, object_name)
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            # Make sure to close the response to release the connection
+            response.close()
+            response.release_conn()
+        logging.info(f'Stream file: {object_name} from bucket: {bucket_name}')
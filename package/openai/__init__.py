@@ -1,2 +1,10 @@
 from .prompts import PromptManager
 from .client import ChatGPTClient
+from .summarizer import DEFAULT_REDUCE_PROMPT, ChunkSummarizer
+from .embeddings import EmbeddingDispatcher
+from .cache import CompletionCache, EmbeddingCache, RedisVectorStore, SQLiteVectorStore
+from .history import ChatHistory
+from .session import ChatSession
+from .chunker import TextChunk, TextChunker
+from .ratelimit import RateLimiter
+from .concurrency import AdaptiveConcurrencyLimiter
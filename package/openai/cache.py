@@ -0,0 +1,281 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Vector = List[float]
+
+
+def text_hash(text: str) -> str:
+    """Hash of the text after Unicode and whitespace normalization.
+
+    Args:
+        text: The input text.
+
+    Returns:
+        Hex digest of the normalized text.
+    """
+    normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    return array('f', vector).tobytes()
+
+
+def unpack_vector(blob: bytes) -> Vector:
+    vector = array('f')
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class RedisVectorStore(object):
+    def __init__(self, redis_client, prefix: str = 'openai:embedding:', ttl: Optional[int] = None):
+        """Persistent embedding tier in Redis, vectors stored as float32 blobs.
+
+        Args:
+            redis_client: Redis client.
+            prefix: Key prefix.
+            ttl: Expiration in seconds, None keeps vectors forever.
+        """
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return self.redis_client.mget([self.prefix + key for key in keys])
+
+    def set_many(self, blobs: Dict[str, bytes]) -> None:
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for key, blob in blobs.items():
+            pipeline.set(self.prefix + key, blob, ex=self.ttl)
+        pipeline.execute()
+
+
+class SQLiteVectorStore(object):
+    def __init__(self, path: str):
+        """Persistent embedding tier in a local SQLite file, vectors stored as float32 blobs.
+
+        Args:
+            path: Path to the database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)',
+        )
+        self._connection.commit()
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            found = {}
+            # SQLite ограничивает число параметров в запросе
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ','.join('?' * len(part))
+                rows = self._connection.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', part,  # noqa: S608
+                )
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def set_many(self, blobs: Dict[str, bytes]) -> None:
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)', blobs.items(),
+            )
+            self._connection.commit()
+
+
+class EmbeddingCache(object):
+    def __init__(self, maxsize: int = 10000, store: Optional[Any] = None):
+        """Content-addressed embedding cache keyed by model name and normalized text hash.
+
+        Vectors are looked up in an in-process LRU first and then in the optional
+        persistent store (RedisVectorStore or SQLiteVectorStore).
+
+        Args:
+            maxsize: The maximum number of vectors in the in-process tier.
+            store: The persistent tier, None for in-process caching only.
+        """
+        self.maxsize = maxsize
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._local: OrderedDict[str, Vector] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return f'{model_name}:{text_hash(text)}'
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[Vector]]:
+        """Look up vectors for texts.
+
+        Args:
+            model_name: The embeddings model name.
+            texts: Input texts.
+
+        Returns:
+            A vector or None for every text, in input order.
+        """
+        keys = [self.key(model_name, text) for text in texts]
+        vectors: List[Optional[Vector]] = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for index, key in enumerate(keys):
+                vector = self._local.get(key)
+                if vector is None:
+                    missing.append(index)
+                    continue
+                self._local.move_to_end(key)
+                vectors[index] = vector
+        if missing and self.store is not None:
+            blobs = self._store_get([keys[index] for index in missing])
+            for index, blob in zip(missing, blobs):
+                if blob is not None:
+                    vectors[index] = unpack_vector(blob)
+                    self._set_local(keys[index], vectors[index])
+        found = sum(vector is not None for vector in vectors)
+        with self._lock:
+            self.hits += found
+            self.misses += len(vectors) - found
+        return vectors
+
+    def set_many(self, model_name: str, texts: Sequence[str], vectors: Sequence[Vector]) -> None:
+        """Store vectors for texts in both tiers.
+
+        Args:
+            model_name: The embeddings model name.
+            texts: Input texts.
+            vectors: Vectors in the same order as texts.
+        """
+        blobs = {}
+        for text, vector in zip(texts, vectors):
+            key = self.key(model_name, text)
+            self._set_local(key, list(vector))
+            blobs[key] = pack_vector(vector)
+        if blobs and self.store is not None:
+            try:
+                self.store.set_many(blobs)
+            except Exception as e:
+                logging.warning(f'Embedding cache write failed: {e}')
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._local)}
+
+    def _store_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        try:
+            return self.store.get_many(keys)
+        except Exception as e:
+            logging.warning(f'Embedding cache read failed: {e}')
+            return [None] * len(keys)
+
+    def _set_local(self, key: str, vector: Vector) -> None:
+        with self._lock:
+            self._local[key] = vector
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+
+class CompletionCache(object):
+    def __init__(
+            self,
+            maxsize: int = 2048,
+            ttl: Optional[int] = 30 * 24 * 3600,
+            redis_client=None,
+            prefix: str = 'openai:completion:',
+    ):
+        """Exact cache of chat completions keyed by model, system prompt version and message hash.
+
+        Entries live in an in-process LRU bounded by maxsize and, when a Redis client is
+        given, in Redis so every worker shares them. Both tiers expire entries after ttl.
+
+        Args:
+            maxsize: The maximum number of completions in the in-process tier.
+            ttl: Lifetime of an entry in seconds, None for no expiration.
+            redis_client: Optional Redis client for the shared tier.
+            prefix: Key prefix in Redis.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._local: OrderedDict[str, Tuple[Optional[float], str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name: str, system_prompt: Optional[str], message: str) -> str:
+        # Версия промпта — хеш его текста, поэтому правка промпта не отдаёт старые ответы
+        prompt_version = hashlib.sha256((system_prompt or '').encode('utf-8')).hexdigest()[:16]
+        return f'{model_name}:{prompt_version}:{text_hash(message)}'
+
+    def get(self, key: str) -> Optional[str]:  # noqa: WPS231
+        """Return a cached completion or None on miss.
+
+        Args:
+            key: The key built by CompletionCache.key.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, completion = entry
+                if expires_at is None or expires_at > now:
+                    self._local.move_to_end(key)
+                    self.hits += 1
+                    return completion
+                del self._local[key]  # noqa: WPS420
+        completion = None
+        if self.redis_client is not None:
+            try:
+                payload = self.redis_client.get(self.prefix + key)
+            except Exception as e:
+                logging.warning(f'Completion cache read failed: {e}')
+                payload = None
+            if payload is not None:
+                completion = payload.decode('utf-8')
+                self._set_local(key, completion)
+        with self._lock:
+            if completion is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return completion
+
+    def set(self, key: str, completion: str) -> None:  # noqa: WPS125
+        """Store a completion in both tiers.
+
+        Args:
+            key: The key built by CompletionCache.key.
+            completion: The response content of the chat model.
+        """
+        self._set_local(key, completion)
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.set(self.prefix + key, completion.encode('utf-8'), ex=self.ttl)
+        except Exception as e:
+            logging.warning(f'Completion cache write failed: {e}')
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._local)}
+
+    def _set_local(self, key: str, completion: str) -> None:
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._local[key] = (expires_at, completion)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
@@ -0,0 +1,150 @@
+import re
+from collections import deque
+from typing import Deque, Generator, Iterable, List, Tuple
+
+_PARAGRAPHS = re.compile(r'\n[ \t]*\n\s*')
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+# Текст фрагмента и его токены
+Unit = Tuple[str, List[int]]
+
+
+class TextChunk(str):
+    __slots__ = ('tokens', 'encoding')
+
+    def __new__(cls, text: str, tokens: List[int], encoding: str):
+        """Chunk text that carries its token IDs.
+
+        The chunk is a regular string, so it can be passed anywhere text is expected,
+        while token-aware consumers read tokens instead of encoding the text again.
+        Decoding the tokens gives back exactly the chunk text.
+
+        Args:
+            text: The chunk text.
+            tokens: Token IDs of the text.
+            encoding: The name of the tiktoken encoding the tokens belong to.
+        """
+        chunk = super().__new__(cls, text)
+        chunk.tokens = tokens
+        chunk.encoding = encoding
+        return chunk
+
+    def __reduce__(self):
+        return TextChunk, (str(self), self.tokens, self.encoding)
+
+    @property
+    def token_count(self) -> int:
+        return len(self.tokens)
+
+
+def token_ids(text: str, tokenizer) -> List[int]:
+    """Token IDs of the text, reusing the ones carried by a TextChunk.
+
+    Args:
+        text: A plain string or a TextChunk.
+        tokenizer: The tiktoken encoding of the consumer.
+
+    Returns:
+        Token IDs of the text in the given encoding.
+    """
+    if isinstance(text, TextChunk) and text.encoding == tokenizer.name:
+        return text.tokens
+    return tokenizer.encode(text)
+
+
+class TextChunker(object):
+    def __init__(self, tokenizer, chunk_size: int, overlap: int = 0):
+        """Split text into token-bounded chunks along paragraph and sentence boundaries.
+
+        Paragraphs are packed into a chunk while they fit. A paragraph longer than a
+        chunk is split into sentences, and only a sentence longer than a chunk is cut
+        at token offsets. Every piece is tokenized once and chunks are assembled from
+        the token IDs of their pieces, so nothing is decoded or encoded again.
+
+        Args:
+            tokenizer: The tiktoken encoding used to count tokens.
+            chunk_size: The maximum number of tokens in a chunk.
+            overlap: The maximum number of tokens repeated from the end of the previous
+                chunk, taken as whole sentences or paragraphs.
+        """
+        if overlap >= chunk_size:
+            raise ValueError('Chunk overlap must be smaller than the chunk size.')
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def split(self, text: str) -> List[TextChunk]:
+        """Split one text into chunks.
+
+        Args:
+            text: The input text.
+
+        Returns:
+            Chunks in text order.
+        """
+        return list(self.stream([text]))
+
+    def stream(self, texts: Iterable[str], separator: str = '\n') -> Generator[TextChunk, None, None]:
+        """Split a stream of texts into chunks as the texts arrive.
+
+        The texts are treated as if they were joined with the separator. Only the
+        pieces of the chunk being assembled are kept in memory.
+
+        Args:
+            texts: An iterable of texts, for example pages of a document.
+            separator: The string placed between consecutive texts.
+
+        Yields:
+            Chunks of at most chunk_size tokens, in text order.
+        """
+        units: Deque[Unit] = deque()
+        size = 0
+        for unit in self._units(texts, separator):
+            if units and size + len(unit[1]) > self.chunk_size:
+                yield self._chunk(units)
+                # Конец предыдущего чанка повторяется целыми предложениями
+                while units and (size > self.overlap or size + len(unit[1]) > self.chunk_size):
+                    size -= len(units.popleft()[1])
+            units.append(unit)
+            size += len(unit[1])
+        if units:
+            yield self._chunk(units)
+
+    def _chunk(self, units: Deque[Unit]) -> TextChunk:
+        tokens: List[int] = []
+        for _, unit_tokens in units:
+            tokens.extend(unit_tokens)
+        return TextChunk(''.join(text for text, _ in units), tokens, self.tokenizer.name)
+
+    def _units(self, texts: Iterable[str], separator: str) -> Generator[Unit, None, None]:
+        for index, text in enumerate(texts):
+            if index:
+                text = separator + text
+            for paragraph in _split_keep(_PARAGRAPHS, text):
+                if paragraph:
+                    yield from self._paragraph_units(paragraph)
+
+    def _paragraph_units(self, paragraph: str) -> Generator[Unit, None, None]:
+        tokens = self.tokenizer.encode(paragraph)
+        if len(tokens) <= self.chunk_size:
+            yield paragraph, tokens
+            return
+        for sentence in _split_keep(_SENTENCE_END, paragraph):
+            tokens = self.tokenizer.encode(sentence)
+            if len(tokens) <= self.chunk_size:
+                yield sentence, tokens
+                continue
+            for start in range(0, len(tokens), self.chunk_size):
+                piece = tokens[start:start + self.chunk_size]
+                yield self.tokenizer.decode(piece), piece
+
+
+def _split_keep(pattern: re.Pattern, text: str) -> List[str]:
+    # Разделители остаются в конце фрагментов, поэтому склейка фрагментов даёт исходный текст
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+    return pieces
@@ -1,11 +1,23 @@
 import logging
-from typing import Any, List, Optional, Generator
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Generator, Iterable, List, Optional, Tuple
 
 import tiktoken
-from langchain.schema import HumanMessage, SystemMessage
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from pydantic import SecretStr
 
+from package.openai.cache import CompletionCache, EmbeddingCache
+from package.openai.chunker import TextChunk, TextChunker, token_ids
+from package.openai.concurrency import AdaptiveConcurrencyLimiter, is_retryable, retry_after
+from package.openai.embeddings import EmbeddingDispatcher
+from package.openai.history import ChatHistory
+from package.openai.ratelimit import RateLimiter
+from package.openai.session import ChatSession
+
 
 class ChatGPTClient(object):
     def __init__(
@@ -15,6 +27,20 @@ class ChatGPTClient(object):
             embeddings_model_name: str = 'text-embedding-ada-002',
             system_prompt: Optional[str] = None,
             mathematical_percent: Optional[int] = 20,
+            embeddings_batch_tokens: int = 100000,
+            embeddings_batch_size: int = 256,
+            embeddings_concurrency: int = 4,
+            embedding_cache: Optional[EmbeddingCache] = None,
+            completion_cache: Optional[CompletionCache] = None,
+            chunk_overlap: int = 0,
+            chat_rate_limiter: Optional[RateLimiter] = None,
+            embeddings_rate_limiter: Optional[RateLimiter] = None,
+            completion_tokens_estimate: int = 500,
+            chat_concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+            embeddings_concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+            base_url: Optional[str] = None,
+            chat_retries: int = 3,
+            retry_backoff: float = 1.0,
     ):
         """Initialize the configuration for interacting with OpenAI's GPT-4 and text.
 
@@ -37,37 +63,119 @@ class ChatGPTClient(object):
             mathematical_percent: An optional integer defining a mathematical parameter,
                 defaulting to 100. This parameter may be used for internal calculations
                 or configurations.
-
+            embeddings_batch_tokens: The maximum total number of tokens in one
+                embeddings request.
+            embeddings_batch_size: The maximum number of inputs in one embeddings
+                request.
+            embeddings_concurrency: The maximum number of embeddings requests in
+                flight.
+            embedding_cache: An optional content-addressed cache consulted before
+                any embeddings request is made.
+            completion_cache: An optional exact cache of stateless completions.
+            chunk_overlap: The maximum number of tokens repeated between
+                neighbouring chunks.
+            chat_rate_limiter: An optional limiter for the quota of the chat model.
+            embeddings_rate_limiter: An optional limiter for the quota of the
+                embeddings model.
+            completion_tokens_estimate: The number of response tokens reserved for
+                every chat request until the actual usage is known.
+            chat_concurrency_limiter: An optional adaptive limit on chat requests
+                in flight.
+            embeddings_concurrency_limiter: An optional adaptive limit on
+                embeddings requests in flight.
+            base_url: An optional base URL of an OpenAI-compatible API, for example
+                a local stand-in used for load tests.
+            chat_retries: The number of attempts for a chat request that failed with
+                a transient error, at least 1.
+            retry_backoff: The base delay in seconds between chat attempts, doubled
+                every retry.
+
+        Raises:
+            ValueError: If chat_retries is less than 1.
         """
+        if chat_retries < 1:
+            raise ValueError('Chat retries must be at least 1.')
         self._api_key = api_key
         self.model_name = model_name
         self.math_p = mathematical_percent
         self.embeddings_model_name = embeddings_model_name
+        # Повторы SDK обходят ограничители, поэтому повторяет только invoke_chat и EmbeddingDispatcher
         self.chat_model = ChatOpenAI(
             openai_api_key=self._api_key,
             model_name=self.model_name,
+            openai_api_base=base_url,
+            max_retries=0,
         )
+        # Входы уже ограничены по токенам в EmbeddingDispatcher, повторная токенизация в langchain не нужна
         self.embeddings_model = OpenAIEmbeddings(
             openai_api_key=self._api_key,
             model=self.embeddings_model_name,
+            openai_api_base=base_url,
+            check_embedding_ctx_length=False,
+            max_retries=0,
         )
-        self.chat_history = []
+        # Сессия по умолчанию для send_message; документы получают собственные сессии через session()
+        self._default_session = ChatSession(self, system_prompt)
+        self._default_session_lock = threading.Lock()
 
         # Явно указываем токенизаторы
         self.tokenizer = tiktoken.get_encoding('cl100k_base')
         self.embeddings_tokenizer = tiktoken.get_encoding('cl100k_base')
 
-        # Установка системного промпта, если он предоставлен
-        self.system_prompt = system_prompt
-        if self.system_prompt:
-            system_message = SystemMessage(content=self.system_prompt)
-            self.chat_history.append(system_message)
-
         # Установка лимитов токенов в зависимости от моделей
 
         self.token = self.get_model_token_limit(self.model_name)
         self.max_tokens = self.token - int((self.token / 100) * self.math_p)
         self.embeddings_max_tokens = self.get_model_token_limit(self.embeddings_model_name)
+        self.embedding_dispatcher = EmbeddingDispatcher(
+            self.embeddings_model,
+            self.embeddings_tokenizer,
+            max_item_tokens=self.embeddings_max_tokens,
+            max_batch_tokens=embeddings_batch_tokens,
+            max_batch_items=embeddings_batch_size,
+            max_workers=embeddings_concurrency,
+            rate_limiter=embeddings_rate_limiter,
+            concurrency_limiter=embeddings_concurrency_limiter,
+        )
+        self.embedding_cache = embedding_cache
+        self.completion_cache = completion_cache
+        self.chunk_overlap = chunk_overlap
+        self.chat_rate_limiter = chat_rate_limiter
+        self.completion_tokens_estimate = completion_tokens_estimate
+        self.chat_concurrency_limiter = chat_concurrency_limiter
+        self.chat_retries = chat_retries
+        self.retry_backoff = retry_backoff
+        self._system_prompt_tokens: Dict[str, int] = {}
+
+    @property
+    def system_prompt(self) -> Optional[str]:
+        return self._default_session.system_prompt
+
+    @system_prompt.setter
+    def system_prompt(self, system_prompt: Optional[str]) -> None:
+        self._default_session.history.system_prompt = system_prompt
+
+    @property
+    def chat_history(self) -> ChatHistory:
+        return self._default_session.history
+
+    def session(self, system_prompt: Optional[str] = None) -> ChatSession:
+        """Create a lightweight conversation with its own prompt and history.
+
+        The session shares the models, tokenizers and caches of this client, which
+        are safe to use from many threads, so documents can be processed
+        concurrently without sharing any conversation state.
+
+        Args:
+            system_prompt: The system prompt of the conversation. If None, the
+                client's system prompt is used.
+
+        Returns:
+            ChatSession: A new conversation bound to this client.
+        """
+        if system_prompt is None:
+            system_prompt = self.system_prompt
+        return ChatSession(self, system_prompt)
 
     def get_model_token_limit(self, model_name: str) -> int:
         """Retrieve the token limit for a specified model.
@@ -102,9 +210,10 @@ class ChatGPTClient(object):
 
         This method processes a list of texts by tokenizing each text and checking
         if the number of tokens is within the specified maximum tokens limit. If a
-        text exceeds the token limi, it splits the text into smaller chunks that
-        fit the limit. It then generates embeddings for all valid texts or chunks
-        using the specified embeddings model.
+        text exceeds the token limit, it splits the text into smaller chunks that
+        fit the limit. The texts are then packed into token-bounded requests that
+        are sent in parallel, and the vectors are returned in input order. Inputs
+        found in the embedding cache are not sent at all.
 
         Args:
             texts (List[str]): A list of input texts to generate embeddings for.
@@ -112,20 +221,44 @@ class ChatGPTClient(object):
         Returns:
             List[Any]: A list containing the embeddings of the valid texts.
         """
-        valid_texts = []
-        for text in texts:
-            tokens = self.embeddings_tokenizer.encode(text)
-            if len(tokens) <= self.embeddings_max_tokens:
-                valid_texts.append(text)
-            else:
-                chunks = self.split_text_into_chunks(
-                    text,
-                    self.embeddings_max_tokens,
-                    tokenizer=self.embeddings_tokenizer,
-                )
-                valid_texts.extend(chunks)
-        logging.info('Create Embeddings.')
-        return self.embeddings_model.embed_documents(valid_texts)
+        items = self.embedding_dispatcher.prepare(list(texts))
+        if self.embedding_cache is None:
+            return self.embedding_dispatcher.embed_items(items)
+
+        item_texts = [text for text, _ in items]
+        vectors = self.embedding_cache.get_many(self.embeddings_model_name, item_texts)
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if missing:
+            new_vectors = self.embedding_dispatcher.embed_items([items[index] for index in missing])
+            for index, vector in zip(missing, new_vectors):
+                vectors[index] = vector
+            self.embedding_cache.set_many(
+                self.embeddings_model_name, [item_texts[index] for index in missing], new_vectors,
+            )
+        logging.info(f'Embedding cache: {len(items) - len(missing)} hits, {len(missing)} misses.')
+        return vectors
+
+    def create_embeddings_stream(self, texts: Iterable[str]) -> Tuple[List[str], List[Any]]:
+        """Create embeddings for a stream of texts while the stream is still being produced.
+
+        Texts are grouped into request-sized batches as they arrive and every full
+        batch goes through create_embeddings in the background, so cache lookups and
+        requests stay batched and overlap with the producer.
+
+        Args:
+            texts (Iterable[str]): Input texts, consumed lazily.
+
+        Returns:
+            Tuple[List[str], List[Any]]: The consumed texts and their embeddings in input order.
+        """
+        collected: List[str] = []
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.embedding_dispatcher.max_workers) as executor:
+            for batch in self.embedding_dispatcher.stream_batches(texts):
+                collected.extend(batch)
+                futures.append(executor.submit(self.create_embeddings, batch))
+            vectors = [vector for future in futures for vector in future.result()]
+        return collected, vectors
 
     def tokenize_text(self, text: str, tokenizer=None) -> List[int]:
         """Tokenize the input text using the specified tokenizer.
@@ -145,44 +278,81 @@ class ChatGPTClient(object):
         """
         if tokenizer is None:
             tokenizer = self.tokenizer
-        tokens = tokenizer.encode(text)
+        tokens = token_ids(text, tokenizer)
         logging.info('Tokenize text.')
         return tokens
 
-    def split_text_into_chunks(self, text: str, chunk_size: int, tokenizer=None) -> List[str]:  # noqa: WPS210
+    def split_text_into_chunks(
+            self,
+            text: str,
+            chunk_size: int,
+            tokenizer=None,
+            overlap: Optional[int] = None,
+    ) -> List[TextChunk]:
         """Split the provided text into chunks based on a specified chunk size.
 
-        The text is tokenized using the provided tokenizer (or a default tokenizer),
-        divided into segments of tokens, and then each segment is decoded back into a
-        text chunk. This function is useful for handling large text by processing it in
-        smaller manageable pieces.
+        Chunks follow paragraph and sentence boundaries and may repeat the last
+        sentences of the previous chunk. Each chunk carries its token IDs, so the
+        embeddings and chat requests built from it do not tokenize it again.
 
         Args:
             text: The input text that needs to be chunked.
-            chunk_size: The number of tokens each chunk should contain.
+            chunk_size: The maximum number of tokens each chunk should contain.
             tokenizer: An optional tokenizer to be used for tokenizing the text. If no
                 tokenizer is provided, a default tokenizer is used.
+            overlap: The maximum number of tokens repeated between neighbouring
+                chunks. If None, the client's chunk_overlap is used.
 
         Returns:
-            A list of strings where each string is a chunk of the original text.
+            A list of chunks of the original text.
         """
-        if tokenizer is None:
-            tokenizer = self.tokenizer
-        tokens = self.tokenize_text(text, tokenizer)
-        chunks = []
-        for i in range(0, len(tokens), chunk_size):
-            chunk_tokens = tokens[i:i + chunk_size]
-            chunk_text = tokenizer.decode(chunk_tokens)
-            chunks.append(chunk_text)
+        chunks = self._chunker(chunk_size, tokenizer, overlap).split(text)
         logging.info('Split text to chunks.')
         return chunks
 
+    def stream_text_into_chunks(
+            self,
+            texts: Iterable[str],
+            chunk_size: int,
+            separator: str = '\n',
+            tokenizer=None,
+            overlap: Optional[int] = None,
+    ) -> Generator[TextChunk, None, None]:
+        """Split a stream of texts into chunks as the texts arrive.
+
+        Streaming counterpart of split_text_into_chunks: the texts are treated as if
+        they were joined with the separator, but each one is tokenized on arrival and
+        a chunk is yielded as soon as the next piece no longer fits. Only the pieces of
+        the current chunk are kept in memory.
+
+        Args:
+            texts: An iterable of texts, for example pages of a document.
+            chunk_size: The maximum number of tokens each chunk should contain.
+            separator: The string placed between consecutive texts.
+            tokenizer: An optional tokenizer to be used for tokenizing the text. If no
+                tokenizer is provided, a default tokenizer is used.
+            overlap: The maximum number of tokens repeated between neighbouring
+                chunks. If None, the client's chunk_overlap is used.
+
+        Yields:
+            Chunks of the joined text, each of at most chunk_size tokens.
+        """
+        yield from self._chunker(chunk_size, tokenizer, overlap).stream(texts, separator)
+        logging.info('Stream text to chunks.')
+
+    def _chunker(self, chunk_size: int, tokenizer, overlap: Optional[int]) -> TextChunker:
+        if tokenizer is None:
+            tokenizer = self.tokenizer
+        if overlap is None:
+            overlap = self.chunk_overlap
+        return TextChunker(tokenizer, chunk_size, min(overlap, chunk_size // 2))
+
     def send_message(self, message: str) -> str:
         """Send a message to a chat model and receive a response.
 
-        This function manages chat history by appending the human message and assistant
-        response, and ensures that the token limit for the model is not
-        exceeded before sending the message.
+        The message goes to the client's default conversation, serialized by a lock.
+        Per-document work should use session() instead, so that documents do not
+        share one history.
 
         Args:
             message (str): The message content to be sent to the chat model.
@@ -190,56 +360,130 @@ class ChatGPTClient(object):
         Returns:
             str: The response content from the chat model.
         """
-        # Проверяем, не превышает ли сообщение лимит токенов модели
-        human_message = HumanMessage(content=message)
-        new_message_tokens = len(self.tokenize_text(human_message.content))
-        self.trim_chat_history(new_message_tokens)
-        self.chat_history.append(human_message)
-        assistant_message = self.chat_model.invoke(self.chat_history)
-        self.chat_history.append(assistant_message)
-        logging.info('Send message to OpenAI client.')
-        return assistant_message.content
+        with self._default_session_lock:
+            return self._default_session.send_message(message)
 
-    def trim_chat_history(self, new_message_tokens_length):
-        """Trim the chat history to ensure the total number of tokens does not exceed a predefined maximum.
+    def complete(self, message: str, system_prompt: Optional[str] = None) -> str:
+        """Send a single message to the chat model without touching the chat history.
 
-        This function iterates through the chat history starting from the most recent
-        message, adding messages to a trimmed history list until the token limit is reached.
+        Unlike send_message, the request carries only the system prompt and the
+        message, so calls are independent of each other and safe to run concurrently.
+        Because the answer depends only on the model, the system prompt and the
+        message, it is served from the completion cache when possible.
 
         Args:
-            new_message_tokens_length: The number of tokens in the new message
-                to be considered alongside the existing chat history.
+            message (str): The message content to be sent to the chat model.
+            system_prompt (Optional[str]): The system prompt for this request. If None,
+                the client's system prompt is used.
+
+        Returns:
+            str: The response content from the chat model.
         """
+        if system_prompt is None:
+            system_prompt = self.system_prompt
+        cache_key = None
+        if self.completion_cache is not None:
+            cache_key = self.completion_cache.key(self.model_name, system_prompt, message)
+            cached = self.completion_cache.get(cache_key)
+            if cached is not None:
+                logging.info('Completion cache hit.')
+                return cached
+
+        messages = [HumanMessage(content=message)]
+        if system_prompt:
+            messages.insert(0, SystemMessage(content=system_prompt))
+        assistant_message = self.invoke_chat(
+            messages, lambda: len(token_ids(message, self.tokenizer)) + self.prompt_tokens(system_prompt),
+        )
+        logging.info('Send stateless message to OpenAI client.')
+        if cache_key is not None:
+            self.completion_cache.set(cache_key, assistant_message.content)
+        return assistant_message.content
 
-        total_tokens = new_message_tokens_length
-        trimmed_history = []
-        # Начинаем с последних сообщений
-        for message in reversed(self.chat_history):
-            message_tokens = len(self.tokenize_text(message.content))
-            if (total_tokens + message_tokens) <= self.max_tokens:
-                trimmed_history.insert(0, message)  # Вставляем в начало
-                total_tokens += message_tokens
-            else:
-                break
+    def invoke_chat(self, messages: List[BaseMessage], prompt_tokens: Callable[[], int]) -> BaseMessage:
+        """Send messages to the chat model within the rate and concurrency limits of the model.
 
-        # Эта проверка гарантирует, что системное сообщение присутствует в начале
-        if self.system_prompt:
-            system_message = SystemMessage(content=self.system_prompt)
-            trimmed_history.insert(0, system_message)
+        Every attempt reserves its prompt tokens and completion_tokens_estimate response
+        tokens before it is sent, and the difference from the actual usage is settled
+        once the response arrives. Every attempt holds a slot of the adaptive
+        concurrency limiter, which learns from its latency and errors. Transient errors
+        are retried here rather than inside the SDK, so retries stay within both limits.
 
-        self.chat_history = trimmed_history
+        Args:
+            messages: The messages of the request.
+            prompt_tokens: Returns the number of prompt tokens. Called only when a rate
+                limiter is set, so requests are not tokenized for nothing.
 
-    def reset_chat_history(self):
-        """Manage the chat history including adding system prompts when necessary.
+        Returns:
+            BaseMessage: The response message of the chat model.
+        """
+        rate_limited = self.chat_rate_limiter is not None and self.chat_rate_limiter.enabled
+        estimate = prompt_tokens() + self.completion_tokens_estimate if rate_limited else 0
+        for attempt in range(1, self.chat_retries + 1):
+            if rate_limited:
+                self.chat_rate_limiter.acquire(estimate)
+            try:
+                with self._slot(self.chat_concurrency_limiter):
+                    assistant_message = self.chat_model.invoke(messages)
+                break
+            except Exception as e:
+                if attempt == self.chat_retries or not is_retryable(e):
+                    raise
+                delay = max(self.retry_backoff * 2 ** (attempt - 1), retry_after(e) or 0)
+                logging.warning(f'Chat request failed ({e}), retry in {delay:.1f}s.')
+                time.sleep(delay)
+        if not rate_limited:
+            return assistant_message
+        usage = assistant_message.response_metadata.get('token_usage') or {}
+        if usage.get('total_tokens'):
+            self.chat_rate_limiter.refund(estimate - usage['total_tokens'])
+        return assistant_message
+
+    def metrics(self) -> Dict[str, Any]:
+        """Current state of the caches and limiters of the client.
+
+        Returns:
+            Dict[str, Any]: Stats of every configured cache and limiter by name.
+        """
+        components = {
+            'embedding_cache': self.embedding_cache,
+            'completion_cache': self.completion_cache,
+            'chat_concurrency': self.chat_concurrency_limiter,
+            'embeddings_concurrency': self.embedding_dispatcher.concurrency_limiter,
+        }
+        metrics: Dict[str, Any] = {
+            name: component.stats() for name, component in components.items() if component is not None
+        }
+        rate_limiters = {
+            'chat_rate': self.chat_rate_limiter,
+            'embeddings_rate': self.embedding_dispatcher.rate_limiter,
+        }
+        for name, limiter in rate_limiters.items():
+            if limiter is not None and limiter.enabled:
+                metrics[name] = {'waited': limiter.waited}
+        return metrics
+
+    @staticmethod
+    def _slot(limiter: Optional[AdaptiveConcurrencyLimiter]) -> ContextManager:
+        return nullcontext() if limiter is None else limiter.slot()
+
+    def prompt_tokens(self, system_prompt: Optional[str]) -> int:
+        """Number of tokens in a system prompt, computed once per prompt."""
+        if not system_prompt:
+            return 0
+        if system_prompt not in self._system_prompt_tokens:
+            self._system_prompt_tokens[system_prompt] = len(self.tokenizer.encode(system_prompt))
+        return self._system_prompt_tokens[system_prompt]
 
-        Attributes:
-            chat_history (list): A list that stores the chat history.
-            system_prompt (str): A string representing the system prompt to be added
-                to chat history, if it exists.
+    def trim_chat_history(self, new_message_tokens_length):
+        """Trim the default conversation so the history and the new message fit the model limit.
+
+        Args:
+            new_message_tokens_length: The number of tokens in the new message
+                to be considered alongside the existing chat history.
         """
-        self.chat_history = []
-        # Повторно добавляем системный промпт, если он есть
-        if self.system_prompt:
-            system_message = SystemMessage(content=self.system_prompt)
-            self.chat_history.append(system_message)
-        logging.info('Reset chat history.')
+        self._default_session.trim(new_message_tokens_length)
+
+    def reset_chat_history(self):
+        """Clear the default conversation, keeping the system prompt."""
+        self._default_session.reset()
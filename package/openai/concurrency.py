@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Generator, List, Optional, Tuple
+
+import openai
+
+RATE_LIMITED = 'rate_limited'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+HIGH_LATENCY = 'high_latency'
+HIGH_ERROR_RATE = 'high_error_rate'
+HEALTHY = 'healthy'
+
+
+def classify_error(error: BaseException) -> str:
+    """Map an exception of an API call to an outcome of the limiter.
+
+    Args:
+        error: The exception raised by the request.
+
+    Returns:
+        RATE_LIMITED, TIMEOUT or ERROR.
+    """
+    if isinstance(error, openai.RateLimitError) or getattr(error, 'status_code', None) == 429:
+        return RATE_LIMITED
+    if isinstance(error, (openai.APITimeoutError, TimeoutError)):
+        return TIMEOUT
+    return ERROR
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Tell whether a failed API call may succeed when it is sent again.
+
+    Rate limits, timeouts, connection failures and server errors are transient;
+    invalid requests, such as an input over the context length, fail the same way
+    on every attempt.
+
+    Args:
+        error: The exception raised by the request.
+
+    Returns:
+        True if the request is worth retrying.
+    """
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError, TimeoutError)):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return status_code == 429 or (isinstance(status_code, int) and status_code >= 500)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay in seconds the API asked for in the Retry-After header, if any."""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveConcurrencyLimiter(object):
+    def __init__(
+            self,
+            name: str,
+            initial_limit: int = 4,
+            min_limit: int = 1,
+            max_limit: int = 32,
+            latency_target: float = 10.0,
+            max_error_rate: float = 0.1,
+            window: int = 20,
+            backoff: float = 0.5,
+            cooldown: float = 5.0,
+    ):
+        """AIMD limit on the number of API requests in flight.
+
+        After every window of completed requests the limit grows by one while the p95
+        latency stays below the target and the error rate stays low, and is multiplied
+        by backoff otherwise. A 429 or a timeout cuts the limit at once; further cuts
+        wait for the cooldown, so one burst of rejections counts as a single signal.
+
+        Args:
+            name: The limiter name used in logs and metrics, usually the model name.
+            initial_limit: The limit to start with.
+            min_limit: The lowest limit.
+            max_limit: The highest limit.
+            latency_target: The p95 latency in seconds above which the limit is cut.
+            max_error_rate: The share of failed requests in a window above which the limit is cut.
+            window: The number of completed requests between increases.
+            backoff: The multiplier applied to the limit on a cut.
+            cooldown: The minimum time in seconds between two cuts.
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.limit = max(min_limit, min(initial_limit, max_limit))
+        self.in_flight = 0
+        self.changes: Counter = Counter()
+        self.history: Deque[Tuple[float, int, int, str]] = deque(maxlen=50)
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._last_cut = 0.0
+        self._last_p95: Optional[float] = None
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Generator[None, None, None]:
+        """Hold one in-flight slot for the duration of a request.
+
+        The latency of the request is recorded on success, and the kind of error on
+        failure, before the exception is re-raised.
+        """
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._release(None, classify_error(e))
+            raise
+        self._release(time.monotonic() - started, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'name': self.name,
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'p95_latency': self._last_p95,
+                'changes': dict(self.changes),
+                'history': list(self.history),
+            }
+
+    def _release(self, latency: Optional[float], outcome: Optional[str]) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if outcome in {RATE_LIMITED, TIMEOUT}:
+                self._cut(outcome)
+            else:
+                self._record(latency, outcome)
+            self._condition.notify_all()
+
+    def _record(self, latency: Optional[float], outcome: Optional[str]) -> None:
+        if outcome is None:
+            self._latencies.append(latency)
+        else:
+            self._errors += 1
+        completed = len(self._latencies) + self._errors
+        if completed < self.window:
+            return
+        latencies = sorted(self._latencies)
+        self._last_p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else None
+        error_rate = self._errors / completed
+        self._latencies = []
+        self._errors = 0
+        if error_rate > self.max_error_rate:
+            self._cut(HIGH_ERROR_RATE)
+        elif self._last_p95 is not None and self._last_p95 > self.latency_target:
+            self._cut(HIGH_LATENCY)
+        elif self.limit < self.max_limit and self.in_flight + 1 >= self.limit:
+            # Лимит растёт только когда он действительно используется
+            self._change(self.limit + 1, HEALTHY)
+
+    def _cut(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_cut < self.cooldown:
+            return
+        self._last_cut = now
+        self._latencies = []
+        self._errors = 0
+        self._change(max(self.min_limit, int(self.limit * self.backoff)), reason)
+
+    def _change(self, limit: int, reason: str) -> None:
+        if limit == self.limit:
+            return
+        self.changes[reason] += 1
+        logging.info(f'Concurrency limiter {self.name}: {self.limit} -> {limit} ({reason}).')
+        self.history.append((time.time(), self.limit, limit, reason))
+        self.limit = limit
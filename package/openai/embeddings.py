@@ -0,0 +1,182 @@
+import logging
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, ContextManager, Generator, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_openai import OpenAIEmbeddings
+
+from package.openai.chunker import token_ids
+from package.openai.concurrency import AdaptiveConcurrencyLimiter, is_retryable, retry_after
+from package.openai.ratelimit import RateLimiter
+
+# Текст и число его токенов
+Item = Tuple[str, int]
+# Тексты запроса и их суммарное число токенов
+Batch = Tuple[List[str], int]
+
+
+class EmbeddingDispatcher(object):
+    def __init__(
+            self,
+            embeddings_model: OpenAIEmbeddings,
+            tokenizer,
+            max_item_tokens: int,
+            max_batch_tokens: int = 100000,
+            max_batch_items: int = 256,
+            max_workers: int = 4,
+            retries: int = 3,
+            backoff: float = 1.0,
+            rate_limiter: Optional[RateLimiter] = None,
+            concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    ):
+        """Pack texts into token-bounded requests and embed them in parallel.
+
+        Texts longer than the model limit are split into token chunks first. Batches
+        are limited both by the total number of tokens and the number of items, sent
+        concurrently, and retried independently, so one rejected batch does not fail
+        the whole document. Only transient errors are retried; an invalid request
+        fails at once.
+
+        Args:
+            embeddings_model: The langchain embeddings model used for requests.
+            tokenizer: The tokenizer matching the embeddings model.
+            max_item_tokens: The maximum number of tokens in one input.
+            max_batch_tokens: The maximum total number of tokens in one request.
+            max_batch_items: The maximum number of inputs in one request.
+            max_workers: The maximum number of requests in flight.
+            retries: The number of attempts for each batch.
+            backoff: The base delay in seconds between attempts, doubled every retry.
+            rate_limiter: Optional limiter every request reserves its tokens from.
+            concurrency_limiter: Optional adaptive limit on requests in flight, applied
+                on top of max_workers.
+        """
+        self.embeddings_model = embeddings_model
+        self.tokenizer = tokenizer
+        self.max_item_tokens = max_item_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+
+    def prepare(self, texts: Sequence[str]) -> List[Item]:
+        """Tokenize texts once and split the ones exceeding the model limit.
+
+        Chunks produced by TextChunker reuse their token IDs instead of being encoded
+        again. Items are sent as text, so the embeddings model must be created with
+        check_embedding_ctx_length=False; otherwise langchain encodes every input once more.
+
+        Args:
+            texts: Input texts.
+
+        Returns:
+            Texts with their token counts, in input order.
+        """
+        items: List[Item] = []
+        for text in texts:
+            tokens = token_ids(text, self.tokenizer)
+            if len(tokens) <= self.max_item_tokens:
+                items.append((text, len(tokens)))
+                continue
+            for start in range(0, len(tokens), self.max_item_tokens):
+                chunk_tokens = tokens[start:start + self.max_item_tokens]
+                items.append((self.tokenizer.decode(chunk_tokens), len(chunk_tokens)))
+        return items
+
+    def pack(self, items: List[Item]) -> List[Batch]:
+        """Group items into batches bounded by token budget and item count.
+
+        Args:
+            items: Texts with their token counts.
+
+        Returns:
+            Batches of texts with their total token counts, in input order.
+        """
+        batches: List[Batch] = []
+        for text, tokens in items:
+            if not batches or self._is_full(batches[-1], tokens):
+                batches.append(([], 0))
+            batch_texts, batch_tokens = batches[-1]
+            batch_texts.append(text)
+            batches[-1] = (batch_texts, batch_tokens + tokens)
+        return batches
+
+    def _is_full(self, batch: Batch, tokens: int) -> bool:
+        batch_texts, batch_tokens = batch
+        return len(batch_texts) >= self.max_batch_items or batch_tokens + tokens > self.max_batch_tokens
+
+    def stream_batches(self, texts: Iterable[str]) -> Generator[List[str], None, None]:
+        """Group a stream of texts into request-sized lists as the texts arrive.
+
+        A list is yielded as soon as the next text would not fit the token budget or
+        the item count of one request, so it can be embedded while later texts are
+        still being produced.
+
+        Args:
+            texts: Input texts, consumed lazily.
+
+        Yields:
+            Texts of one request, in input order.
+        """
+        batch: List[str] = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = len(token_ids(text, self.tokenizer))
+            if batch and (len(batch) >= self.max_batch_items or batch_tokens + tokens > self.max_batch_tokens):
+                yield batch
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def embed(self, texts: Sequence[str]) -> List[Any]:
+        """Embed texts and return vectors in input order.
+
+        Args:
+            texts: Input texts.
+
+        Returns:
+            One vector per input, or per token chunk of an oversize input.
+        """
+        return self.embed_items(self.prepare(texts))
+
+    def embed_items(self, items: List[Item]) -> List[Any]:
+        """Embed already tokenized items and return vectors in input order.
+
+        Args:
+            items: Texts with their token counts.
+
+        Returns:
+            One vector per item.
+        """
+        batches = self.pack(items)
+        if not batches:
+            return []
+        workers = max(1, min(self.max_workers, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda batch: self._embed_batch(*batch), batches))
+        logging.info(f'Create Embeddings: {len(items)} inputs in {len(batches)} requests.')
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    def _embed_batch(self, batch: List[str], tokens: int) -> List[Any]:
+        for attempt in range(1, self.retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(tokens)
+            try:
+                with self._slot():
+                    return self.embeddings_model.embed_documents(batch)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                delay = max(self.backoff * 2 ** (attempt - 1), retry_after(e) or 0)
+                logging.warning(f'Embedding batch of {len(batch)} failed ({e}), retry in {delay:.1f}s.')
+                time.sleep(delay)
+        return []
+
+    def _slot(self) -> ContextManager:
+        return nullcontext() if self.concurrency_limiter is None else self.concurrency_limiter.slot()
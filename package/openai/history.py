@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from langchain.schema import BaseMessage, SystemMessage
+
+
+class ChatHistory(object):
+    def __init__(self, system_prompt: Optional[str] = None):
+        """Chat history with token counts cached per message.
+
+        Every message is stored together with its token count, computed once when
+        the message is added, and a running total is kept, so trimming only pops the
+        oldest messages from the front. The system prompt is kept apart and is
+        always sent first.
+
+        Args:
+            system_prompt: An optional system prompt placed before all messages.
+        """
+        self._entries: Deque[Tuple[BaseMessage, int]] = deque()
+        self.total_tokens = 0
+        self._system_message: Optional[SystemMessage] = None
+        self.system_prompt = system_prompt
+
+    @property
+    def system_prompt(self) -> Optional[str]:
+        return None if self._system_message is None else self._system_message.content
+
+    @system_prompt.setter
+    def system_prompt(self, system_prompt: Optional[str]) -> None:
+        self._system_message = SystemMessage(content=system_prompt) if system_prompt else None
+
+    def append(self, message: BaseMessage, tokens: int) -> None:
+        """Add a message with its already computed token count.
+
+        Args:
+            message: The chat message.
+            tokens: The number of tokens in the message content.
+        """
+        self._entries.append((message, tokens))
+        self.total_tokens += tokens
+
+    def trim(self, budget: int) -> None:
+        """Drop the oldest messages until the history fits the token budget.
+
+        Args:
+            budget: The maximum total number of tokens of the kept messages.
+        """
+        while self._entries and self.total_tokens > budget:
+            _, tokens = self._entries.popleft()
+            self.total_tokens -= tokens
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.total_tokens = 0
+
+    def messages(self) -> List[BaseMessage]:
+        """Messages to send to the chat model, the system prompt first."""
+        messages = [message for message, _ in self._entries]
+        if self._system_message is not None:
+            messages.insert(0, self._system_message)
+        return messages
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        return iter(self.messages())
+
+    def __len__(self) -> int:
+        return len(self._entries) + (self._system_message is not None)
@@ -0,0 +1,163 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Уровни корзин пополняются по времени сервера Redis, поэтому часы воркеров не важны
+_TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local force = ARGV[#KEYS * 2 + 1] == '1'
+local wait = 0
+local levels = {}
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local cost = tonumber(ARGV[i * 2])
+    local state = redis.call('HMGET', KEYS[i], 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - ts) * capacity / 60000)
+    levels[i] = level
+    if cost > level then
+        wait = math.max(wait, math.ceil((cost - level) * 60000 / capacity))
+    end
+end
+for i = 1, #KEYS do
+    local level = levels[i]
+    if wait == 0 or force then
+        level = math.min(tonumber(ARGV[i * 2 - 1]), level - tonumber(ARGV[i * 2]))
+    end
+    redis.call('HSET', KEYS[i], 'level', tostring(level), 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], 120000)
+end
+if force then
+    return 0
+end
+return wait
+"""
+
+
+class RateLimiter(object):
+    def __init__(
+            self,
+            name: str,
+            tokens_per_minute: Optional[int] = None,
+            requests_per_minute: Optional[int] = None,
+            redis_client=None,
+            prefix: str = 'openai:ratelimit:',
+            max_sleep: float = 5.0,
+    ):
+        """Token bucket limiter for the tokens-per-minute and requests-per-minute quotas of a model.
+
+        With a Redis client the buckets live in Redis and are shared by every worker of
+        the cluster, each check being a single atomic script call. Without Redis, or
+        while Redis is unavailable, the buckets are kept in process.
+
+        A caller reserves the estimated cost of a request before sending it and waits
+        while either bucket is short. Waits are jittered, so workers blocked on the same
+        bucket do not wake up together.
+
+        Args:
+            name: The bucket name, usually the model name.
+            tokens_per_minute: The tokens quota, None or 0 for no limit.
+            requests_per_minute: The requests quota, None or 0 for no limit.
+            redis_client: Optional Redis client for the shared buckets.
+            prefix: Key prefix in Redis.
+            max_sleep: The longest single sleep in seconds before the buckets are checked again.
+        """
+        self.name = name
+        self.tokens_per_minute = tokens_per_minute or None
+        self.requests_per_minute = requests_per_minute or None
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.max_sleep = max_sleep
+        self.waited = 0.0
+        self._script = redis_client.register_script(_TOKEN_BUCKET_SCRIPT) if redis_client is not None else None
+        self._local: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.tokens_per_minute is not None or self.requests_per_minute is not None
+
+    def acquire(self, tokens: int) -> float:
+        """Reserve one request and the given number of tokens, waiting for the quota.
+
+        Args:
+            tokens: The estimated number of tokens of the request.
+
+        Returns:
+            The time spent waiting in seconds.
+        """
+        if not self.enabled:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens, 1)
+            if wait <= 0:
+                break
+            delay = min(self.max_sleep, wait) * random.uniform(1.0, 1.2)  # noqa: S311
+            time.sleep(delay)
+            waited += delay
+        if waited:
+            logging.info(f'Rate limiter {self.name}: waited {waited:.2f}s for {tokens} tokens.')
+            with self._lock:
+                self.waited += waited
+        return waited
+
+    def refund(self, tokens: int) -> None:
+        """Return unused tokens of a reservation, or charge more when tokens is negative.
+
+        Args:
+            tokens: The estimated cost minus the actual usage of a request.
+        """
+        if self.tokens_per_minute is not None and tokens:
+            # Списание сверх оценки проводится сразу, уровень корзины может уйти в минус
+            self._try_acquire(-tokens, 0, force=True)
+
+    def _buckets(self, tokens: int, requests: int) -> List[Tuple[str, int, int]]:
+        buckets = []
+        if self.tokens_per_minute is not None and tokens:
+            # Запрос дороже минутной квоты никогда не пройдёт, поэтому стоимость ограничена ёмкостью
+            buckets.append(('tokens', self.tokens_per_minute, min(tokens, self.tokens_per_minute)))
+        if self.requests_per_minute is not None and requests:
+            buckets.append(('requests', self.requests_per_minute, requests))
+        return buckets
+
+    def _try_acquire(self, tokens: int, requests: int, force: bool = False) -> float:
+        buckets = self._buckets(tokens, requests)
+        if not buckets:
+            return 0.0
+        if self._script is not None:
+            try:
+                return self._try_redis(buckets, force)
+            except Exception as e:
+                logging.warning(f'Rate limiter {self.name}: Redis unavailable ({e}), using local buckets.')
+        return self._try_local(buckets, force)
+
+    def _try_redis(self, buckets: List[Tuple[str, int, int]], force: bool) -> float:
+        keys = [f'{self.prefix}{self.name}:{bucket}' for bucket, _, _ in buckets]
+        args = []
+        for _, capacity, cost in buckets:
+            args.extend((capacity, cost))
+        args.append(int(force))
+        return int(self._script(keys=keys, args=args)) / 1000
+
+    def _try_local(self, buckets: List[Tuple[str, int, int]], force: bool) -> float:
+        now = time.monotonic()
+        with self._lock:
+            levels = {}
+            wait = 0.0
+            for bucket, capacity, cost in buckets:
+                level, updated_at = self._local.get(bucket, (capacity, now))
+                level = min(capacity, level + (now - updated_at) * capacity / 60)
+                levels[bucket] = level
+                if cost > level:
+                    wait = max(wait, (cost - level) * 60 / capacity)
+            for bucket, capacity, cost in buckets:
+                level = levels[bucket]
+                if not wait or force:
+                    level = min(capacity, level - cost)
+                self._local[bucket] = (level, now)
+        return 0.0 if force else wait
@@ -0,0 +1,80 @@
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from langchain.schema import HumanMessage
+
+from package.openai.chunker import token_ids
+from package.openai.history import ChatHistory
+
+if TYPE_CHECKING:
+    from package.openai.client import ChatGPTClient
+
+
+class ChatSession(object):
+    def __init__(self, client: 'ChatGPTClient', system_prompt: Optional[str] = None):
+        """Per-document conversation on top of a shared ChatGPTClient.
+
+        The client holds the thread-safe parts (chat and embeddings models,
+        tokenizers, caches), while the session holds its own system prompt and chat
+        history. Sessions are cheap to create, so every document gets its own and
+        concurrent documents never see each other's messages.
+
+        Args:
+            client: The shared client used as model and transport.
+            system_prompt: The system prompt of this conversation.
+        """
+        self.client = client
+        self.history = ChatHistory(system_prompt)
+
+    @property
+    def system_prompt(self) -> Optional[str]:
+        return self.history.system_prompt
+
+    def send_message(self, message: str) -> str:
+        """Send a message within the conversation and receive a response.
+
+        The human message and the response are appended to the session history,
+        trimmed to the model token limit before sending. Each message is tokenized
+        once, when it is added, and a TextChunk is not tokenized at all.
+
+        Args:
+            message (str): The message content to be sent to the chat model.
+
+        Returns:
+            str: The response content from the chat model.
+        """
+        human_message = HumanMessage(content=message)
+        new_message_tokens = len(token_ids(message, self.client.tokenizer))
+        self.trim(new_message_tokens)
+        self.history.append(human_message, new_message_tokens)
+        assistant_message = self.client.invoke_chat(
+            self.history.messages(),
+            lambda: self.history.total_tokens + self.client.prompt_tokens(self.system_prompt),
+        )
+        self.history.append(assistant_message, len(self.client.tokenizer.encode(assistant_message.content)))
+        logging.info('Send message to OpenAI client.')
+        return assistant_message.content
+
+    def complete(self, message: str) -> str:
+        """Send a stateless message with the session system prompt.
+
+        Args:
+            message (str): The message content to be sent to the chat model.
+
+        Returns:
+            str: The response content from the chat model.
+        """
+        return self.client.complete(message, self.system_prompt)
+
+    def trim(self, new_message_tokens_length: int) -> None:
+        """Drop the oldest messages so the history and the new message fit the model limit.
+
+        Args:
+            new_message_tokens_length: The number of tokens in the new message.
+        """
+        self.history.trim(self.client.max_tokens - new_message_tokens_length)
+
+    def reset(self) -> None:
+        """Clear the conversation, keeping the system prompt."""
+        self.history.clear()
+        logging.info('Reset chat history.')
@@ -0,0 +1,106 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from package.openai.client import ChatGPTClient
+from package.openai.session import ChatSession
+
+DEFAULT_REDUCE_PROMPT = """Ты — редактор. Тебе дают несколько последовательных фрагментов одного конспекта.
+Объедини их в единый связный текст: убери повторы, сохрани порядок изложения, структуру и терминологию."""
+
+
+class ChunkSummarizer(object):
+    def __init__(
+            self,
+            client: ChatGPTClient,
+            max_workers: int = 4,
+            reduce_prompt: Optional[str] = None,
+    ):
+        """Concurrent map-reduce summarization of text chunks.
+
+        Every chunk is sent as an independent request with only the system prompt,
+        so up to max_workers requests are in flight at once. Results keep the
+        original chunk order. An optional reduce step merges the partial results
+        with one more request per group that fits the model token limit.
+
+        Args:
+            client: The client whose chat model and tokenizer are used.
+            max_workers: The maximum number of concurrent requests.
+            reduce_prompt: The system prompt for the reduce step. If None, the
+                reduce step is skipped.
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.reduce_prompt = reduce_prompt
+
+    def map(self, chunks: Iterable[str], session: Optional[ChatSession] = None) -> List[str]:  # noqa: WPS125
+        """Summarize chunks concurrently.
+
+        Args:
+            chunks: Text chunks in document order.
+            session: The document conversation whose system prompt is used. If None,
+                the client's system prompt is used.
+
+        Returns:
+            Responses of the chat model in the same order as the chunks.
+        """
+        system_prompt = None if session is None else session.system_prompt
+        return self._complete_all(chunks, system_prompt)
+
+    def reduce(self, results: List[str]) -> str:  # noqa: WPS231
+        """Merge partial results into one text.
+
+        Results are grouped so that each group fits the model token limit, and the
+        groups are merged concurrently until a single text is left.
+
+        Args:
+            results: Partial results in document order.
+
+        Returns:
+            The merged text.
+        """
+        while len(results) > 1:
+            groups = self._group_by_tokens(results)
+            if len(groups) == len(results):
+                # Ни одна пара результатов не помещается в лимит, объединять нечего
+                return '\n\n'.join(results)
+            results = self._complete_all(('\n\n'.join(group) for group in groups), self.reduce_prompt)
+        return results[0] if results else ''
+
+    def summarize(self, chunks: Iterable[str], session: Optional[ChatSession] = None) -> str:
+        """Run the map step and, if a reduce prompt is set, the reduce step.
+
+        Args:
+            chunks: Text chunks in document order.
+            session: The document conversation whose system prompt is used for the map step.
+
+        Returns:
+            Concatenated map results, or the merged text when reduce is enabled.
+        """
+        results = self.map(chunks, session)
+        if self.reduce_prompt is None:
+            return ''.join(results)
+        return self.reduce(results)
+
+    def _complete_all(self, texts: Iterable[str], system_prompt: Optional[str]) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        workers = max(1, min(self.max_workers, len(texts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda text: self.client.complete(text, system_prompt), texts))
+        logging.info(f'Summarized {len(texts)} chunks with {workers} workers.')
+        return results
+
+    def _group_by_tokens(self, results: List[str]) -> List[List[str]]:
+        groups: List[List[str]] = []
+        group_tokens = 0
+        for result in results:
+            tokens = len(self.client.tokenizer.encode(result))
+            if groups and group_tokens + tokens <= self.client.max_tokens:
+                groups[-1].append(result)
+                group_tokens += tokens
+            else:
+                groups.append([result])
+                group_tokens = tokens
+        return groups
@@ -1 +1,9 @@
-from .main import PDFProcessor
+from .main import PDFProcessor, can_spawn_processes
+from .session import ExtractionSession
+from .tools import PageTable
+from .exceptions import ScannedDocumentError
+from .record import FormattedPageRecord, PageRecord
+from .cache import PageCache, PageFingerprinter
+from .stream import MappedStream, spool_document
+from .cleaner import BoilerplateCleaner
+from .fingerprint import SimHash
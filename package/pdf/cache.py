@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from PyPDF2 import PageObject
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+from package.pdf.record import PageRecord, page_record_from_dict
+from package.pdf.tools import content_data
+
+
+class PageFingerprinter(object):
+    def __init__(self):
+        """
+        Computes content hashes of pages of one document.
+
+        Digests of indirect objects (fonts, images, forms) are memoized, so resources shared
+        by many pages are decoded and hashed only once per document.
+        """
+        self._object_digests: Dict[Tuple[int, int], bytes] = {}
+
+    def fingerprint(self, page: PageObject) -> str:
+        """
+        Returns a hash of the page content stream, resources, media box and rotation.
+
+        Args:
+            page (PageObject): Page object from PyPDF2 library.
+
+        Returns:
+            str: Hex digest identifying the page content across documents.
+        """
+        hasher = hashlib.blake2b(digest_size=20)
+        # Хешируются сырые байты потока, без разбора операторов в ContentStream
+        contents = content_data(page)
+        if contents is not None:
+            hasher.update(contents)
+        hasher.update(repr([float(value) for value in page.mediabox]).encode())
+        # Поворот меняет разметку, которую строит pdfminer
+        hasher.update(f'rotate:{page.rotation}'.encode())
+        resources = page.raw_get('/Resources') if '/Resources' in page else None
+        if resources is not None:
+            self._feed(hasher, resources, set())
+        return hasher.hexdigest()
+
+    def _feed(self, hasher, obj: Any, visiting: set) -> None:  # noqa: WPS231
+        if isinstance(obj, IndirectObject):
+            hasher.update(self._object_digest(obj, visiting))
+        elif isinstance(obj, StreamObject):
+            self._feed_dict(hasher, obj, visiting)
+            hasher.update(obj.get_data())
+        elif isinstance(obj, DictionaryObject):
+            self._feed_dict(hasher, obj, visiting)
+        elif isinstance(obj, ArrayObject):
+            hasher.update(b'[')
+            for item in obj:
+                self._feed(hasher, item, visiting)
+            hasher.update(b']')
+        else:
+            hasher.update(repr(obj).encode())
+
+    def _feed_dict(self, hasher, obj: DictionaryObject, visiting: set) -> None:
+        hasher.update(b'<<')
+        for key in sorted(obj.keys()):
+            if key in {'/Parent', '/Length'}:
+                continue
+            hasher.update(key.encode())
+            self._feed(hasher, obj.raw_get(key), visiting)
+        hasher.update(b'>>')
+
+    def _object_digest(self, reference: IndirectObject, visiting: set) -> bytes:
+        key = (reference.idnum, reference.generation)
+        if key in self._object_digests:
+            return self._object_digests[key]
+        if key in visiting:
+            # Циклическая ссылка: номер объекта зависит от документа, поэтому хешируем только маркер
+            return b'R'
+        visiting.add(key)
+        hasher = hashlib.blake2b(digest_size=20)
+        self._feed(hasher, reference.get_object(), visiting)
+        visiting.discard(key)
+        digest = hasher.digest()
+        self._object_digests[key] = digest
+        return digest
+
+
+class PageCache(object):
+    def __init__(
+            self,
+            maxsize: int = 1024,
+            redis_client=None,
+            ttl: Optional[int] = None,
+            prefix: str = 'pdf:page:',
+    ):
+        """
+        Two-tier cache of page extraction results keyed by page content hash.
+
+        Args:
+            maxsize (int): Maximum number of records in the local LRU tier.
+            redis_client: Optional Redis client for the shared tier.
+            ttl (Optional[int]): Expiration in seconds for records in the shared tier.
+            prefix (str): Key prefix in the shared tier.
+        """
+        self.maxsize = maxsize
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._local: OrderedDict[str, PageRecord] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[PageRecord]:
+        """
+        Returns a cached page record, looking in the local tier first and then in Redis.
+
+        Args:
+            key (str): Page cache key.
+
+        Returns:
+            Optional[PageRecord]: Cached record or None on miss.
+        """
+        with self._lock:
+            record = self._local.get(key)
+            if record is not None:
+                self._local.move_to_end(key)
+                return record
+        if self.redis_client is None:
+            return None
+        try:
+            payload = self.redis_client.get(self.prefix + key)
+        except Exception as e:
+            logging.warning(f'Page cache read failed: {e}')
+            return None
+        if payload is None:
+            return None
+        try:
+            record = page_record_from_dict(json.loads(payload))
+        except (ValueError, KeyError, TypeError) as e:
+            # Повреждённая или устаревшая запись считается промахом и удаляется
+            logging.warning(f'Page cache entry {key} is unreadable ({e}), dropped.')
+            self._delete_shared(key)
+            return None
+        self._set_local(key, record)
+        return record
+
+    def set(self, key: str, record: PageRecord) -> None:  # noqa: WPS125
+        """
+        Stores a page record in both tiers.
+
+        Args:
+            key (str): Page cache key.
+            record (PageRecord): Extraction result of the page.
+        """
+        self._set_local(key, record)
+        if self.redis_client is None:
+            return
+        try:
+            payload = json.dumps(record.to_dict(), ensure_ascii=False)
+            self.redis_client.set(self.prefix + key, payload.encode('utf-8'), ex=self.ttl)
+        except Exception as e:
+            logging.warning(f'Page cache write failed: {e}')
+
+    def _delete_shared(self, key: str) -> None:
+        try:
+            self.redis_client.delete(self.prefix + key)
+        except Exception as e:
+            logging.warning(f'Page cache delete failed: {e}')
+
+    def _set_local(self, key: str, record: PageRecord) -> None:
+        with self._lock:
+            self._local[key] = record
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
@@ -0,0 +1,183 @@
+import re
+from collections import Counter
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple
+
+# Номер страницы, стоящий отдельной строкой вверху или внизу страницы
+_PAGE_NUMBER = re.compile(r'^(?:[-–—]?\s*\d+\s*[-–—]?|\d+\s*/\s*\d+)$')
+# Номер страницы внутри колонтитула: «Page 3», «стр. 3», «3 / 10», «3 из 10», «- 3 -»
+_PAGE_NUMBER_PART = re.compile(
+    r'(?:\b(?:page|p\.|стр\.?|страница|с\.)\s*\d+(?:\s*(?:/|of|из)\s*\d+)?'
+    r'|\b\d+\s*(?:/|of|из)\s*\d+\b'
+    r'|[-–—]\s*\d+\s*[-–—])',
+    re.IGNORECASE,
+)
+_DIGITS = re.compile(r'\d+')
+# Перенос по дефису: слово и составное слово («северо-западный») не различить, поэтому дефис остаётся
+_HYPHENATION = re.compile(r'(\w)-\n\s*([a-zа-яё])')
+_SPACES = re.compile(r'[ \t\f\v\u00a0]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+class BoilerplateCleaner(object):
+    def __init__(
+            self,
+            min_repeat_ratio: float = 0.5,
+            min_pages: int = 3,
+            window: int = 12,
+            max_line_length: int = 120,
+            edge_lines: int = 3,
+            token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Removes running headers, footers, page numbers and layout noise from page texts.
+
+        Only the first and last edge_lines lines of a page are header and footer
+        candidates. Candidates repeated on a large share of the first pages of the
+        document are learned and stripped from the edges of every page; lines are
+        compared as is, except for page numbers in a recognizable form. Table rows
+        are never stripped. A bare number is dropped only as the first or last line
+        of a page and only when it continues the page numbering learned from the
+        first pages. Lines broken at a hyphen are joined keeping the hyphen, and
+        whitespace is collapsed.
+
+        Args:
+            min_repeat_ratio (float): Share of pages a line must appear on to count as boilerplate.
+            min_pages (int): Minimum number of pages needed to learn repeated lines.
+            window (int): Number of first pages used to learn repeated lines.
+            max_line_length (int): Longer lines are never treated as boilerplate.
+            edge_lines (int): Number of lines at the top and at the bottom of a page that may be boilerplate.
+            token_counter (Optional[Callable[[str], int]]): Counts tokens to report savings.
+        """
+        self.min_repeat_ratio = min_repeat_ratio
+        self.min_pages = min_pages
+        self.window = window
+        self.max_line_length = max_line_length
+        self.edge_lines = edge_lines
+        self.token_counter = token_counter
+        self.boilerplate: Set[str] = set()
+        self.page_number_offset: Optional[int] = None
+        self.removed_lines = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def _normalize(self, line: str) -> str:
+        # Номера страниц в колонтитулах отличаются, остальные цифры сравниваются как есть
+        return _PAGE_NUMBER_PART.sub('#', _SPACES.sub(' ', line).strip().lower())
+
+    def _is_candidate(self, line: str) -> bool:
+        # Строки таблиц относятся к содержимому, даже если повторяются
+        return 0 < len(line) <= self.max_line_length and not line.startswith('|')
+
+    def _lines(self, text: str) -> List[str]:
+        return [_SPACES.sub(' ', line).strip() for line in _HYPHENATION.sub(r'\1-\2', text).split('\n')]
+
+    def _edges(self, lines: List[str]) -> Tuple[Set[int], Set[int]]:
+        """
+        Returns indexes of the top and bottom edge lines, counting only non-empty lines.
+        """
+        filled = [index for index, line in enumerate(lines) if line]
+        return set(filled[:self.edge_lines]), set(filled[-self.edge_lines:] if self.edge_lines else [])
+
+    def _strip_boilerplate(self, lines: List[str]) -> List[str]:
+        top, bottom = self._edges(lines)
+        edges = top | bottom
+        return [
+            line for index, line in enumerate(lines)
+            if index not in edges or not self._is_candidate(line) or self._normalize(line) not in self.boilerplate
+        ]
+
+    def _edge_numbers(self, lines: List[str]) -> Dict[int, int]:
+        """
+        Returns bare numbers standing as the first or the last non-empty line, by line index.
+        """
+        filled = [index for index, line in enumerate(lines) if line]
+        return {
+            index: int(_DIGITS.search(lines[index]).group())
+            for index in ({filled[0], filled[-1]} if filled else set())
+            if _PAGE_NUMBER.match(lines[index])
+        }
+
+    def learn(self, pages: List[str]) -> None:
+        """
+        Finds header and footer lines repeated across pages and the page numbering.
+
+        Args:
+            pages (List[str]): Texts of the first pages of the document.
+        """
+        if len(pages) < self.min_pages:
+            return
+        counter: Counter = Counter()
+        for page in pages:
+            lines = self._lines(page)
+            top, bottom = self._edges(lines)
+            counter.update({
+                self._normalize(lines[index]) for index in top | bottom if self._is_candidate(lines[index])
+            })
+        threshold = max(2, int(len(pages) * self.min_repeat_ratio))
+        self.boilerplate = {line for line, count in counter.items() if count >= threshold}
+        # Номер страницы отличается от её порядкового номера на одно и то же смещение
+        offsets: Counter = Counter()
+        for page_num, page in enumerate(pages):
+            kept = self._strip_boilerplate(self._lines(page))
+            offsets.update({number - page_num for number in self._edge_numbers(kept).values()})
+        offset, count = offsets.most_common(1)[0] if offsets else (None, 0)
+        self.page_number_offset = offset if count >= threshold else None
+
+    def clean_page(self, text: str, page_num: Optional[int] = None) -> str:
+        """
+        Cleans the text of one page.
+
+        Args:
+            text (str): Page text as produced by PDFProcessor.extract.
+            page_num (Optional[int]): Position of the page in the cleaned stream; bare
+                page numbers are kept without it.
+
+        Returns:
+            str: Page text without boilerplate lines and layout noise.
+        """
+        lines = self._lines(text)
+        kept = self._strip_boilerplate(lines)
+        self.removed_lines += len(lines) - len(kept)
+        # Отдельное число снимается, только если оно крайняя строка и продолжает нумерацию страниц
+        if page_num is not None and self.page_number_offset is not None:
+            for index, number in sorted(self._edge_numbers(kept).items(), reverse=True):
+                if number == page_num + self.page_number_offset:
+                    self.removed_lines += 1
+                    del kept[index]
+        return _BLANK_LINES.sub('\n\n', '\n'.join(kept)).strip()
+
+    def clean(self, pages: Iterable[str]) -> Generator[str, None, None]:
+        """
+        Cleans a stream of page texts, keeping their order.
+
+        The first window pages are buffered to learn repeated lines, the rest are
+        cleaned as they arrive.
+
+        Args:
+            pages (Iterable[str]): Page texts in document order.
+
+        Yields:
+            str: Cleaned page texts.
+        """
+        pages = iter(pages)
+        head = []
+        for page in pages:
+            head.append(page)
+            if len(head) >= self.window:
+                break
+        self.learn(head)
+        for page_num, page in enumerate(head):
+            yield self._clean_counted(page, page_num)
+        for page_num, page in enumerate(pages, start=len(head)):
+            yield self._clean_counted(page, page_num)
+
+    def _clean_counted(self, text: str, page_num: int) -> str:
+        cleaned = self.clean_page(text, page_num)
+        if self.token_counter is not None:
+            self.tokens_before += self.token_counter(text)
+            self.tokens_after += self.token_counter(cleaned)
+        return cleaned
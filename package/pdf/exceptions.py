@@ -0,0 +1,2 @@
+class ScannedDocumentError(ValueError):
+    """Документ не содержит текстового слоя (например, отсканированные страницы)."""
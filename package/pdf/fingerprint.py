@@ -0,0 +1,72 @@
+import hashlib
+import re
+from typing import Iterable, List
+
+_WORDS = re.compile(r'\w+')
+
+
+class SimHash(object):
+    def __init__(self, bits: int = 64, shingle: int = 3):
+        """
+        Incremental SimHash of a document text.
+
+        The text is normalized to lower-case words and every run of shingle consecutive
+        words is a feature. Documents that differ only in a small share of their text
+        get fingerprints within a few bits of Hamming distance, so a near-duplicate is
+        found by one lookup instead of comparing the texts.
+
+        Args:
+            bits (int): Fingerprint length in bits, a multiple of 8.
+            shingle (int): Number of words in one feature.
+        """
+        self.bits = bits
+        self.shingle = shingle
+        self.features = 0
+        self._weights: List[int] = [0] * bits
+        self._tail: List[str] = []
+
+    def update(self, text: str) -> None:
+        """
+        Adds the next part of the document; shingles continue across parts.
+
+        Args:
+            text (str): Text of a page or a chunk, in document order.
+        """
+        words = self._tail + _WORDS.findall(text.lower())
+        if len(words) < self.shingle:
+            self._tail = words
+            return
+        hashes = [
+            self._feature_bits(' '.join(words[start:start + self.shingle]))
+            for start in range(len(words) - self.shingle + 1)
+        ]
+        # Подсчёт единиц по столбцам битовых строк выполняется в C, а не в цикле по битам
+        for bit, column in enumerate(zip(*hashes)):
+            self._weights[bit] += 2 * column.count('1') - len(hashes)
+        self.features += len(hashes)
+        self._tail = words[-(self.shingle - 1):] if self.shingle > 1 else []
+
+    def digest(self) -> bytes:
+        """
+        Returns the fingerprint, a bit set where the majority of features had it set.
+
+        A text shorter than one shingle has no features and is fingerprinted by the
+        hash of its words, so short unrelated texts do not all get the zero fingerprint.
+        """
+        if not self.features:
+            return int(self._feature_bits(' '.join(self._tail)), 2).to_bytes(self.bits // 8, 'big')
+        value = 0
+        for weight in self._weights:
+            value = (value << 1) | (weight > 0)
+        return value.to_bytes(self.bits // 8, 'big')
+
+    def _feature_bits(self, feature: str) -> str:
+        digest = hashlib.blake2b(feature.encode(), digest_size=self.bits // 8).digest()
+        return format(int.from_bytes(digest, 'big'), f'0{self.bits}b')
+
+    @classmethod
+    def of(cls, texts: Iterable[str], bits: int = 64, shingle: int = 3) -> 'SimHash':
+        simhash = cls(bits, shingle)
+        for text in texts:
+            simhash.update(text)
+        return simhash
@@ -1,125 +1,395 @@
-from typing import Any, BinaryIO, Dict, List, Optional
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import BinaryIO, Dict, Generator, Iterable, List, Optional, Tuple, Union
 
-import pdfplumber
 import PyPDF2
-from pdfminer.high_level import extract_pages
 from pdfminer.layout import LTPage, LTRect, LTTextContainer
 
-from .tools import extract_table, table_converter, text_extraction
+from .cache import PageCache, PageFingerprinter
+from .exceptions import ScannedDocumentError
+from .record import FormattedPageRecord, PageRecord
+from .session import ExtractionSession
+from .tools import EMPTY_PAGE, PIPE_FORMAT, PageTable, classify_page, text_extraction
+
+PageSlice = List[Tuple[int, PageRecord]]
+# Меняется при изменении структуры PageRecord, чтобы не читать из кэша записи старого формата
+PAGE_CACHE_VERSION = 'v3'
+
+
+def split_page_range(start_page: int, end_page: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Splits a page range into contiguous, nearly equal slices.
+
+    Args:
+        start_page (int): The starting page number (0-indexed).
+        end_page (int): The ending page number (0-indexed, exclusive).
+        parts (int): The maximum number of slices.
+
+    Returns:
+        List[Tuple[int, int]]: Slices as (start, end) pairs in page order.
+    """
+    total = end_page - start_page
+    parts = max(1, min(parts, total))
+    size, rest = divmod(total, parts)
+    slices = []
+    slice_start = start_page
+    for part in range(parts):
+        slice_end = slice_start + size + (1 if part < rest else 0)
+        slices.append((slice_start, slice_end))
+        slice_start = slice_end
+    return slices
+
+
+def can_spawn_processes() -> bool:
+    """
+    Tells whether this process may start a process pool.
+
+    Children of a Celery prefork pool are daemonic, and daemonic processes are not
+    allowed to have children; the check covers both multiprocessing and billiard.
+    """
+    if multiprocessing.current_process().daemon:
+        return False
+    try:
+        from billiard.process import current_process as billiard_current_process
+    except ImportError:
+        return True
+    return not billiard_current_process().daemon
+
+
+def _process_page_slice(source: Union[bytes, str], page_numbers: List[int], capture_formatting: bool) -> PageSlice:
+    """
+    Extracts a slice of pages in a pool process and returns only the page records.
+
+    The document comes as a path of a file on disk or, for in-memory documents, as bytes.
+    """
+    with open(source, 'rb') if isinstance(source, str) else BytesIO(source) as pdf_file:  # noqa: WPS515
+        with PDFProcessor(pdf_file, capture_formatting=capture_formatting) as pdf_processor:
+            return list(pdf_processor.iter_page_numbers(page_numbers))
 
 
 class PDFProcessor:
-    def __init__(self, pdf_file: BinaryIO):
+    def __init__(self, pdf_file: BinaryIO, capture_formatting: bool = False, page_cache: Optional[PageCache] = None):
         """
         Initialize the PDFProcessor class.
 
         Args:
             pdf_file (BinaryIO): An opened binary file object for the PDF.
+            capture_formatting (bool): Collect per-line font formatting and ordered page content.
+                Off by default, since extract() needs only text and tables.
+            page_cache (Optional[PageCache]): Cache of page records keyed by page content hash.
+                Pages found in it are not processed again.
         """
         self.pdf_file = pdf_file
-        self.text_per_page: Dict[int, Dict[str, Any]] = {}
+        self.capture_formatting = capture_formatting
+        self.text_per_page: Dict[int, PageRecord] = {}
         self.pdf_reader = PyPDF2.PdfReader(self.pdf_file)
+        self.session = ExtractionSession(self.pdf_file)
+        self.page_kinds: Dict[int, str] = {}
+        self.page_cache = page_cache
+        self._fingerprinter: Optional[PageFingerprinter] = None
+
+    def __enter__(self) -> 'PDFProcessor':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Releases the extraction session and all documents opened by it.
+        """
+        self.session.close()
 
     @property
     def pages(self):
         return len(self.pdf_reader.pages)
 
-    def process_pdf(self, start_page: int = 0, end_page: Optional[int] = None) -> None:
+    def classify_pages(self, start_page: int = 0, end_page: Optional[int] = None) -> Dict[int, str]:
+        """
+        Pre-scans PyPDF2 page content streams and classifies each page without layout analysis.
+
+        Args:
+            start_page (int): The starting page number (0-indexed).
+            end_page (Optional[int]): The ending page number (0-indexed, exclusive). If None, classifies until the last page.
+
+        Returns:
+            Dict[int, str]: Page number to page kind (empty, text or tabular).
+        """
+        end_page = self._resolve_end_page(end_page)
+        return {page_num: self.page_kind(page_num) for page_num in range(start_page, end_page)}
+
+    def ensure_text_layer(self, start_page: int = 0, end_page: Optional[int] = None) -> None:
+        """
+        Rejects documents without any text layer before extraction starts.
+
+        Args:
+            start_page (int): The starting page number (0-indexed).
+            end_page (Optional[int]): The ending page number (0-indexed, exclusive). If None, checks until the last page.
+
+        Raises:
+            ScannedDocumentError: If no page in the range has text or rectangles.
+        """
+        kinds = self.classify_pages(start_page, end_page)
+        if all(kind == EMPTY_PAGE for kind in kinds.values()):
+            raise ScannedDocumentError('PDF document has no text layer.')
+
+    def process_pdf(self, start_page: int = 0, end_page: Optional[int] = None, processes: int = 1) -> None:
         """
         Processes a range of pages in the PDF, extracting text and formatting.
 
         Args:
             start_page (int): The starting page number (0-indexed).
             end_page (Optional[int]): The ending page number (0-indexed, exclusive). If None, processes until the last page.
+            processes (int): Number of processes to split the page range across. 1 processes pages in place.
+                In a daemonic process, such as a Celery prefork child, pages are processed in place.
+        """
+        end_page = self._resolve_end_page(end_page)
+
+        if processes > 1 and not can_spawn_processes():
+            logging.debug('Daemonic process cannot start a process pool, pages are extracted in place.')
+            processes = 1
+        if processes > 1 and end_page - start_page > 1:
+            self._process_pdf_parallel(start_page, end_page, processes)
+            return
+
+        for page_num, page_record in self.iter_pages(start_page, end_page):
+            self.text_per_page[page_num] = page_record
+
+    def iter_pages(
+            self, start_page: int = 0, end_page: Optional[int] = None,
+    ) -> Generator[Tuple[int, PageRecord], None, None]:
+        """
+        Yields page records one by one as soon as each page is processed.
+
+        Unlike process_pdf, records are not kept in text_per_page, so memory does not grow with the document.
+
+        Args:
+            start_page (int): The starting page number (0-indexed).
+            end_page (Optional[int]): The ending page number (0-indexed, exclusive). If None, processes until the last page.
+
+        Yields:
+            Tuple[int, PageRecord]: The page number and its extracted content.
+        """
+        yield from self.iter_page_numbers(range(start_page, self._resolve_end_page(end_page)))
+
+    def iter_page_numbers(self, page_numbers: Iterable[int]) -> Generator[Tuple[int, PageRecord], None, None]:
+        """
+        Yields page records for the given pages in order, skipping layout analysis where possible.
+
+        Empty pages get an empty record, pages found in the page cache are served from it,
+        and only the remaining pages go through pdfminer layout analysis.
+
+        Args:
+            page_numbers (Iterable[int]): Page numbers (0-indexed) in ascending order.
+
+        Yields:
+            Tuple[int, PageRecord]: The page number and its extracted content.
+        """
+        page_numbers = list(page_numbers)
+        kinds = {page_num: self.page_kind(page_num) for page_num in page_numbers}
+        cache_keys = self._cache_keys(page_num for page_num, kind in kinds.items() if kind != EMPTY_PAGE)
+        cached = self._cached_records(cache_keys)
+        # Пустые страницы и страницы из кэша не требуют анализа разметки
+        layout_numbers = [
+            page_num for page_num, kind in kinds.items() if kind != EMPTY_PAGE and page_num not in cached
+        ]
+        layouts = self.session.layout_pages(layout_numbers)
+
+        # Документ разбирается pdfminer один раз для всего диапазона страниц
+        for page_num, kind in kinds.items():
+            if kind == EMPTY_PAGE:
+                yield page_num, self.empty_page()
+                continue
+            if page_num in cached:
+                yield page_num, cached[page_num]
+                continue
+            _, page = next(layouts)
+            page_record = self.process_page(page_num, page)
+            self.session.release(page_num)
+            self._cache_record(cache_keys, page_num, page_record)
+            yield page_num, page_record
+
+    def page_kind(self, page_num: int) -> str:
+        """
+        Returns the pre-scan kind of a page, classifying it on first access.
+        """
+        if page_num not in self.page_kinds:
+            self.page_kinds[page_num] = classify_page(self.pdf_reader.pages[page_num])
+        return self.page_kinds[page_num]
+
+    def _cache_keys(self, page_numbers: Iterable[int]) -> Dict[int, str]:
+        if self.page_cache is None:
+            return {}
+        if self._fingerprinter is None:
+            self._fingerprinter = PageFingerprinter()
+        mode = 'formatted' if self.capture_formatting else 'text'
+        return {
+            page_num: f'{PAGE_CACHE_VERSION}:{mode}:{self._fingerprinter.fingerprint(self.pdf_reader.pages[page_num])}'
+            for page_num in page_numbers
+        }
+
+    def _cached_records(self, cache_keys: Dict[int, str]) -> Dict[int, PageRecord]:
+        cached = {}
+        for page_num, key in cache_keys.items():
+            page_record = self.page_cache.get(key)
+            if page_record is not None:
+                cached[page_num] = page_record
+        return cached
+
+    def _cache_record(self, cache_keys: Dict[int, str], page_num: int, page_record: PageRecord) -> None:
+        if page_num in cache_keys:
+            self.page_cache.set(cache_keys[page_num], page_record)
+
+    def stream_extract(self, start_page: int = 0, end_page: Optional[int] = None) -> Generator[str, None, None]:
+        """
+        Streaming counterpart of extract: yields each page's string as soon as the page is processed.
+
+        Args:
+            start_page (int): The starting page number (0-indexed).
+            end_page (Optional[int]): The ending page number (0-indexed, exclusive). If None, processes until the last page.
+
+        Yields:
+            str: The same per-page string that extract yields.
         """
+        for _, page_record in self.iter_pages(start_page, end_page):
+            yield self.page_to_text(page_record)
+
+    def _resolve_end_page(self, end_page: Optional[int]) -> int:
         num_pages = self.pages
 
         # Если конечная страница не указана или превышает количество страниц, установить её на последнюю страницу
         if end_page is None or end_page > num_pages:
-            end_page = num_pages
+            return num_pages
+        return end_page
 
-        # Получаем срез страниц как список PageObject
-        pages_slice = self.pdf_reader.pages[start_page:end_page]
+    def _process_pdf_parallel(self, start_page: int, end_page: int, processes: int) -> None:
+        """
+        Processes page slices in a process pool and merges results in page order.
 
-        # Обрабатываем каждую страницу в указанном срезе
-        for page_num, page_text_obj in enumerate(pages_slice, start=start_page):
-            # Используем pdfminer для более подробной обработки страницы
-            for page in extract_pages(self.pdf_file, page_numbers=[page_num]):
-                page_content = self.process_page(page_num, page)
-                self.text_per_page[page_num] = page_content
+        Cached and empty pages are resolved in this process, only the remaining pages are sent to the pool.
 
-    def process_page(self, pagenum: int, page: LTPage) -> Dict[str, Any]:
+        Args:
+            start_page (int): The starting page number (0-indexed).
+            end_page (int): The ending page number (0-indexed, exclusive).
+            processes (int): The maximum number of pool processes.
+        """
+        page_numbers = range(start_page, end_page)
+        kinds = {page_num: self.page_kind(page_num) for page_num in page_numbers}
+        cache_keys = self._cache_keys(page_num for page_num, kind in kinds.items() if kind != EMPTY_PAGE)
+        records = self._cached_records(cache_keys)
+        for page_num, kind in kinds.items():
+            if kind == EMPTY_PAGE:
+                records[page_num] = self.empty_page()
+        pending = [page_num for page_num in page_numbers if page_num not in records]
+
+        if pending:
+            slices = split_page_range(0, len(pending), processes)
+            pdf_source = self._pool_source()
+            with ProcessPoolExecutor(max_workers=len(slices)) as executor:
+                futures = [
+                    executor.submit(
+                        _process_page_slice, pdf_source, pending[slice_start:slice_end], self.capture_formatting,
+                    )
+                    for slice_start, slice_end in slices
+                ]
+                for future in futures:
+                    for page_num, page_record in future.result():
+                        records[page_num] = page_record
+                        self._cache_record(cache_keys, page_num, page_record)
+
+        # Результаты собираются в порядке страниц, чтобы вывод extract() не менялся
+        for page_num in page_numbers:
+            self.text_per_page[page_num] = records[page_num]
+
+    def _pool_source(self) -> Union[bytes, str]:
+        # Файл на диске открывается процессами пула по пути, в память читаются только документы без пути
+        if isinstance(self.pdf_file, BytesIO):
+            return self.pdf_file.getvalue()
+        name = getattr(self.pdf_file, 'name', None)
+        if isinstance(name, str) and os.path.isfile(name):
+            return name
+        self.pdf_file.seek(0)
+        return self.pdf_file.read()
+
+    def process_page(self, pagenum: int, page: LTPage) -> PageRecord:
         """
-        Processes a single page of the PDF, extracting text, tables, and formatting.
+        Processes a single page of the PDF, extracting text, tables, and optionally formatting.
 
         Args:
             pagenum (int): The page number.
             page (LTPage): The page object from pdfminer.
 
         Returns:
-            Dict[str, Any]: A dictionary with extracted text, formatting, and other page content.
+            PageRecord: Extracted text and structured tables of the page. A FormattedPageRecord with
+                formatting and ordered page content when capture_formatting is enabled.
         """
         page_text: List[str] = []
-        line_format: List[str] = []
-        text_from_images: List[str] = []
-        text_from_tables: List[str] = []
+        line_format: List = []
+        page_tables: List[PageTable] = []
         page_content: List[str] = []
+        capture_formatting = self.capture_formatting
 
         table_num = 0
         first_element = True
         table_extraction_flag = False
-
-        # Используем pdfplumber для извлечения таблиц на указанной странице
-        with pdfplumber.open(self.pdf_file) as pdf:
-            page_tables = pdf.pages[pagenum]
-            tables = page_tables.find_tables()
+        tables = None
 
         page_elements = [(element.y1, element) for element in page._objs]
         page_elements.sort(key=lambda a: a[0], reverse=True)
         for i, component in enumerate(page_elements):
-            pos = component[0]
             element = component[1]
 
             if isinstance(element, LTTextContainer):
                 if not table_extraction_flag:
-                    line_text, format_per_line = text_extraction(element)
+                    if capture_formatting:
+                        line_text, format_per_line = text_extraction(element)
+                        line_format.append(format_per_line)
+                        page_content.append(line_text)
+                    else:
+                        # Без сбора форматирования символы строки не обходятся
+                        line_text = element.get_text()
                     page_text.append(line_text)
-                    line_format.append(format_per_line)
-                    page_content.append(line_text)
 
             if isinstance(element, LTRect):
+                if tables is None:
+                    # Таблицы ищутся только на страницах с прямоугольниками, один раз в рамках сессии
+                    tables = self.session.tables(pagenum)
                 if first_element and (table_num + 1) <= len(tables):
-                    lower_side = page.bbox[3] - tables[table_num].bbox[3]
-                    upper_side = element.y1
-                    table = extract_table(self.pdf_file, pagenum, table_num)
-                    table_string = table_converter(table)
-                    text_from_tables.append(table_string)
-                    page_content.append(table_string)
+                    page_tables.append(tables[table_num])
                     table_extraction_flag = True
                     first_element = False
                     page_text.append('table')
-                    line_format.append('table')
-
-                    if element.y0 >= lower_side and element.y1 <= upper_side:
-                        pass
+                    if capture_formatting:
+                        page_content.append(tables[table_num].to_pipe())
+                        line_format.append('table')
                 elif i + 1 < len(page_elements) and not isinstance(page_elements[i + 1][1], LTRect):
                     # Проверка на выход за пределы списка
                     table_extraction_flag = False
                     first_element = True
                     table_num += 1
 
-        return {
-            'text': page_text,
-            'line_format': line_format,
-            'text_from_images': text_from_images,
-            'text_from_tables': text_from_tables,
-            'page_content': page_content,
-        }
+        if capture_formatting:
+            return FormattedPageRecord(page_text, page_tables, line_format, page_content)
+        return PageRecord(page_text, page_tables)
 
-    def extract(self):
+    def empty_page(self) -> PageRecord:
+        """
+        Returns the record process_page produces for a page without text and rectangles.
+        """
+        if self.capture_formatting:
+            return FormattedPageRecord([], [], [], [])
+        return PageRecord([], [])
+
+    def extract(self, table_format: str = PIPE_FORMAT):
         """
         Generator function that yields the extracted content for each page in the PDF, including text and tables.
 
+        Args:
+            table_format (str): Format tables are rendered in, pipe-separated text by default.
+
         Yields:
             str: A formatted string for each page that includes the page key, text from tables,
                  and main text content, separated by spaces and followed by newlines for readability.
@@ -128,5 +398,19 @@ class PDFProcessor:
             For each page in the PDF, this function will yield a formatted string in the following format:
                 'Page_X <table_text_1> <table_text_2> ... <text_line_1> <text_line_2> ...'
         """
-        for key, value in self.text_per_page.items():
-            yield ' '.join(value['text_from_tables'] + value['text'])
+        for value in self.text_per_page.values():
+            yield self.page_to_text(value, table_format)
+
+    @staticmethod
+    def page_to_text(page_record: PageRecord, table_format: str = PIPE_FORMAT) -> str:
+        """
+        Formats a page record into the string yielded by extract.
+
+        Args:
+            page_record (PageRecord): A page record produced by process_page.
+            table_format (str): Format tables are rendered in, pipe-separated text by default.
+
+        Returns:
+            str: Table text followed by the main text of the page, separated by spaces.
+        """
+        return ' '.join(page_record.render_tables(table_format) + page_record.text)
@@ -0,0 +1,86 @@
+from typing import Any, Dict, List
+
+from package.pdf.tools.table import PIPE_FORMAT, PageTable
+
+
+class PageRecord(object):
+    __slots__ = ('text', 'tables')
+
+    def __init__(self, text: List[str], tables: List[PageTable]):
+        """
+        Compact extraction result of a single page.
+
+        Args:
+            text (List[str]): Text lines of the page, with a 'table' marker in place of each table.
+            tables (List[PageTable]): Structured tables of the page in page order.
+        """
+        self.text = text
+        self.tables = tables
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-compatible form of the record, read back by page_record_from_dict.
+        """
+        return {'text': self.text, 'tables': [table.to_dict() for table in self.tables]}
+
+    @property
+    def text_from_tables(self) -> List[str]:
+        """
+        Tables of the page rendered as pipe-separated text.
+        """
+        return self.render_tables(PIPE_FORMAT)
+
+    def render_tables(self, table_format: str = PIPE_FORMAT) -> List[str]:
+        """
+        Renders tables of the page in the requested format.
+
+        Args:
+            table_format (str): PIPE_FORMAT or MARKDOWN_FORMAT.
+
+        Returns:
+            List[str]: Text view of each table.
+        """
+        return [table.render(table_format) for table in self.tables]
+
+
+class FormattedPageRecord(PageRecord):
+    __slots__ = ('line_format', 'page_content')
+
+    def __init__(self, text: List[str], tables: List[PageTable], line_format: List, page_content: List[str]):
+        """
+        Page extraction result with formatting metadata, produced when formatting capture is enabled.
+
+        Args:
+            text (List[str]): Text lines of the page, with a 'table' marker in place of each table.
+            tables (List[PageTable]): Structured tables of the page in page order.
+            line_format (List): Font name, size, upright and advance values per text line.
+            page_content (List[str]): Text lines and tables in page order.
+        """
+        super().__init__(text, tables)
+        self.line_format = line_format
+        self.page_content = page_content
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data['line_format'] = self.line_format
+        data['page_content'] = self.page_content
+        return data
+
+
+def page_record_from_dict(data: Dict[str, Any]) -> PageRecord:
+    """
+    Restores a page record from its to_dict form.
+
+    Args:
+        data (Dict[str, Any]): The to_dict form of a PageRecord or a FormattedPageRecord.
+
+    Returns:
+        PageRecord: A FormattedPageRecord when formatting was stored, a PageRecord otherwise.
+
+    Raises:
+        KeyError: If a field is missing.
+    """
+    tables = [PageTable.from_dict(table) for table in data['tables']]
+    if 'line_format' in data:
+        return FormattedPageRecord(data['text'], tables, data['line_format'], data['page_content'])
+    return PageRecord(data['text'], tables)
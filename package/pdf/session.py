@@ -0,0 +1,126 @@
+from io import BytesIO
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pdfplumber
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LAParams, LTPage
+from pdfplumber.page import Page
+
+from package.pdf.stream import MappedStream
+from package.pdf.tools.table import PageTable
+
+
+def independent_stream(pdf_file: BinaryIO) -> BinaryIO:
+    """
+    Returns a second stream over the same PDF with its own read position.
+
+    pdfminer and pdfplumber both keep parser buffers tied to the stream position,
+    so they must not share one file object while pages are interleaved.
+
+    Args:
+        pdf_file (BinaryIO): An opened binary file object for the PDF.
+
+    Returns:
+        BinaryIO: A new seekable stream over the same data.
+    """
+    if isinstance(pdf_file, BytesIO):
+        # Документ копируется целиком; в памяти держатся только небольшие документы, большие отображаются с диска
+        return BytesIO(pdf_file.getvalue())
+    raw = getattr(pdf_file, 'raw', pdf_file)
+    if isinstance(raw, MappedStream):
+        return raw.fork().buffered()
+    name = getattr(pdf_file, 'name', None)
+    if isinstance(name, str):
+        return open(name, 'rb')  # noqa: WPS515
+    pdf_file.seek(0)
+    return BytesIO(pdf_file.read())
+
+
+class ExtractionSession(object):
+    def __init__(self, pdf_file: BinaryIO, laparams: Optional[LAParams] = None):
+        """
+        Single-open extraction session over a PDF document.
+
+        The document is parsed once by pdfminer for layout and opened once by
+        pdfplumber for tables. Tables of every page are found and extracted exactly
+        once and reused by all consumers of the session.
+
+        Args:
+            pdf_file (BinaryIO): An opened binary file object for the PDF.
+            laparams (Optional[LAParams]): Layout analysis parameters for pdfminer.
+        """
+        self.pdf_file = pdf_file
+        self.laparams = laparams
+        self._plumber_stream: Optional[BinaryIO] = None
+        self._plumber: Optional[pdfplumber.PDF] = None
+        self._tables: Dict[int, List[PageTable]] = {}
+
+    def __enter__(self) -> 'ExtractionSession':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def plumber(self) -> pdfplumber.PDF:
+        """
+        Lazily opened pdfplumber document shared across all pages.
+        """
+        if self._plumber is None:
+            self._plumber_stream = independent_stream(self.pdf_file)
+            self._plumber = pdfplumber.open(self._plumber_stream)
+        return self._plumber
+
+    def plumber_page(self, page_num: int) -> Page:
+        return self.plumber.pages[page_num]
+
+    def layout_pages(self, page_numbers: Iterable[int]) -> Iterator[Tuple[int, LTPage]]:
+        """
+        Yields pdfminer layouts for the requested pages from a single parse.
+
+        Args:
+            page_numbers (Iterable[int]): Page numbers (0-indexed) to analyse.
+
+        Yields:
+            Tuple[int, LTPage]: Page number and its layout, in document order.
+        """
+        numbers = sorted(set(page_numbers))
+        if not numbers:
+            return
+        self.pdf_file.seek(0)
+        layouts = extract_pages(self.pdf_file, page_numbers=numbers, laparams=self.laparams)
+        yield from zip(numbers, layouts)
+
+    def tables(self, page_num: int) -> List[PageTable]:
+        """
+        Returns the tables of a page, finding and extracting them only once.
+
+        Args:
+            page_num (int): The page number (0-indexed).
+
+        Returns:
+            List[PageTable]: Tables of the page in pdfplumber order.
+        """
+        if page_num not in self._tables:
+            page = self.plumber_page(page_num)
+            self._tables[page_num] = [
+                PageTable(table.bbox, table.extract()) for table in page.find_tables()
+            ]
+            # Кэш объектов страницы больше не нужен, освобождаем память
+            page.flush_cache()
+        return self._tables[page_num]
+
+    def release(self, page_num: int) -> None:
+        """
+        Drops cached tables of a page once it has been processed.
+        """
+        self._tables.pop(page_num, None)
+
+    def close(self) -> None:
+        if self._plumber is not None:
+            self._plumber.close()
+            self._plumber = None
+        if self._plumber_stream is not None:
+            self._plumber_stream.close()
+            self._plumber_stream = None
+        self._tables.clear()
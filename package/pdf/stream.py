@@ -0,0 +1,110 @@
+import io
+import mmap
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Generator, Iterable, Optional
+
+# Разборщики PDF читают и перемещаются мелкими шагами, буфер обслуживает их без вызовов Python-кода
+BUFFER_SIZE = 64 * 1024
+
+
+class MappedStream(io.RawIOBase):
+    def __init__(self, mapped: mmap.mmap, name: Optional[str] = None):
+        """
+        Seekable read-only stream over a memory-mapped file.
+
+        Several streams can share one mapping, each with its own position, so the
+        PDF data is held once in the page cache instead of in each library's buffers.
+        The stream is raw; parsers get it wrapped by buffered(), which serves their
+        small reads and seeks from a buffer.
+
+        Args:
+            mapped (mmap.mmap): Read-only memory map of the PDF file.
+            name (Optional[str]): Path of the mapped file, so other processes can open it.
+        """
+        super().__init__()
+        self._mapped = mapped
+        self._position = 0
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._mapped) - self._position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._mapped[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._mapped)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def fork(self) -> 'MappedStream':
+        """
+        Returns another stream over the same mapping with an independent position.
+        """
+        return MappedStream(self._mapped, self.name)
+
+    def buffered(self) -> io.BufferedReader:
+        """
+        Returns a buffered reader over this stream.
+        """
+        return io.BufferedReader(self, BUFFER_SIZE)
+
+
+@contextmanager
+def spool_document(chunks: Iterable[bytes], max_memory: int) -> Generator[BinaryIO, None, None]:
+    """
+    Collects a streamed document and exposes it as a seekable stream.
+
+    Documents up to max_memory bytes stay in memory. Larger ones are spilled to an
+    anonymous temporary file and memory-mapped, so memory of the task stays flat
+    regardless of the document size. The spilled file has a path, so a process
+    pool can open it instead of receiving a copy of the document.
+
+    Args:
+        chunks (Iterable[bytes]): Document content, for example a MinIO response stream.
+        max_memory (int): Memory budget in bytes for holding the document in RAM.
+
+    Yields:
+        BinaryIO: A seekable binary stream positioned at the start of the document.
+    """
+    buffer = io.BytesIO()
+    spill = None
+    try:
+        for chunk in chunks:
+            if spill is None and buffer.tell() + len(chunk) > max_memory:
+                spill = tempfile.NamedTemporaryFile()  # noqa: WPS515
+                spill.write(buffer.getbuffer())
+                buffer = io.BytesIO()
+            (spill or buffer).write(chunk)
+
+        if spill is None:
+            buffer.seek(0)
+            yield buffer
+            return
+
+        spill.flush()
+        with mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            stream = MappedStream(mapped, spill.name).buffered()
+            try:
+                yield stream
+            finally:
+                stream.close()
+    finally:
+        buffer.close()
+        if spill is not None:
+            spill.close()
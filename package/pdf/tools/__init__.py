@@ -1 +1,3 @@
 from .formatter import extract_table, table_converter, text_extraction
+from .classifier import EMPTY_PAGE, TABULAR_PAGE, TEXT_PAGE, classify_page, content_data
+from .table import MARKDOWN_FORMAT, PIPE_FORMAT, PageTable
@@ -0,0 +1,77 @@
+import re
+from typing import Optional
+
+from PyPDF2 import PageObject
+from PyPDF2.generic import ArrayObject
+
+EMPTY_PAGE = 'empty'
+TEXT_PAGE = 'text'
+TABULAR_PAGE = 'tabular'
+
+# Текст может появиться только внутри блока BT ... ET
+_TEXT_OPERATOR = re.compile(rb'(?:^|\s)BT(?=\s|$)')
+# Прямоугольники pdfminer строит из операторов re и m/l, без них таблиц быть не может
+_PATH_OPERATOR = re.compile(rb'(?:^|\s)(?:re|m|l)(?=\s|$)')
+# Содержимое может рисоваться внешним объектом XObject, операторы которого лежат в его собственном потоке
+_XOBJECT_OPERATOR = re.compile(rb'(?:^|\s)Do(?=\s|$)')
+
+
+def content_data(page: PageObject) -> Optional[bytes]:
+    """
+    Returns the decoded bytes of the page content streams without parsing their operators.
+
+    Args:
+        page: Page object from PyPDF2 library.
+
+    Returns: The stream data, parts of a content array joined by newlines, or None if the page has no content.
+    """
+    if '/Contents' not in page:
+        return None
+    contents = page['/Contents'].get_object()
+    if isinstance(contents, ArrayObject):
+        # Части массива склеиваются через перевод строки, чтобы операторы на границе не слиплись
+        return b'\n'.join(part.get_object().get_data() for part in contents)
+    return contents.get_data()
+
+
+def _draws_only_images(page: PageObject) -> bool:
+    """
+    Checks whether every XObject in the page resources is an image, as on a scanned page.
+
+    Args:
+        page: Page object from PyPDF2 library.
+
+    Returns: True if the page has XObject resources and all of them are images.
+    """
+    resources = page.get('/Resources')
+    xobjects = resources.get_object().get('/XObject') if resources is not None else None
+    if xobjects is None:
+        return False
+    subtypes = [xobject.get_object().get('/Subtype') for xobject in xobjects.get_object().values()]
+    return bool(subtypes) and all(subtype == '/Image' for subtype in subtypes)
+
+
+def classify_page(page: PageObject) -> str:
+    """
+    Function for cheap classification of pdf page by its content stream.
+    Args:
+        page: Page object from PyPDF2 library.
+
+    Returns: One of EMPTY_PAGE (no text layer and no rectangles), TEXT_PAGE (text without
+        rectangles, so no tables are possible) and TABULAR_PAGE (may contain tables). Pages
+        drawing Form XObjects need layout analysis and are TABULAR_PAGE, never EMPTY_PAGE.
+
+    """
+    # Разбор операторов ContentStream здесь не нужен, достаточно поиска по сырым байтам
+    data = content_data(page)
+    if data is None:
+        return EMPTY_PAGE
+    has_paths = _PATH_OPERATOR.search(data) is not None
+    if has_paths:
+        return TABULAR_PAGE
+    # Вызов формы может скрывать и текст, и таблицы; только картинки означают скан
+    if _XOBJECT_OPERATOR.search(data) is not None and not _draws_only_images(page):
+        return TABULAR_PAGE
+    if _TEXT_OPERATOR.search(data) is not None:
+        return TEXT_PAGE
+    return EMPTY_PAGE
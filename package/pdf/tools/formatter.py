@@ -55,17 +55,12 @@ def table_converter(table: TableType) -> str:
     """
     Function for convert table view to text.
     Args:
-        table: Table object (pandas table object)
+        table: Table rows with cells, None for empty cells.
 
     Returns: String view of table in pdf file.
 
     """
-    table_string = ''
-    for row_num in range(len(table)):
-        row = table[row_num]
-        cleaned_row = [
-            item.replace('\n', ' ') if item is not None and '\n' in item else 'None' if item is None else item for item
-            in row]
-        table_string += ('|' + '|'.join(cleaned_row) + '|' + '\n')
-    table_string = table_string[:-1]
-    return table_string
+    return '\n'.join(
+        '|' + '|'.join('None' if item is None else item.replace('\n', ' ') for item in row) + '|'
+        for row in table
+    )
@@ -0,0 +1,73 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from package.pdf.tools.formatter import table_converter
+
+BBox = Tuple[float, float, float, float]
+Row = Tuple[Optional[str], ...]
+
+PIPE_FORMAT = 'pipe'
+MARKDOWN_FORMAT = 'markdown'
+
+
+class PageTable(object):
+    __slots__ = ('bbox', 'rows')
+
+    def __init__(self, bbox: BBox, rows: Sequence[Sequence[Optional[str]]]):
+        """
+        Table found on a page, stored as rows of cells and rendered to text on demand.
+
+        Args:
+            bbox (BBox): Bounding box of the table in pdfplumber coordinates.
+            rows (Sequence[Sequence[Optional[str]]]): Extracted table rows, None for empty cells.
+        """
+        self.bbox = tuple(bbox)
+        self.rows: Tuple[Row, ...] = tuple(tuple(row) for row in rows)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-compatible form of the table.
+        """
+        return {'bbox': list(self.bbox), 'rows': [list(row) for row in self.rows]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PageTable':
+        return cls(data['bbox'], data['rows'])
+
+    def to_pipe(self) -> str:
+        """
+        Renders the table as pipe-separated lines, the format used in extracted page text.
+        """
+        return table_converter(self.rows)
+
+    def to_markdown(self) -> str:
+        """
+        Renders the table as a Markdown table with the first row as header.
+        """
+        if not self.rows:
+            return ''
+        width = max(len(row) for row in self.rows)
+        lines = [self._markdown_row(self.rows[0], width), '|' + ' --- |' * width]
+        lines.extend(self._markdown_row(row, width) for row in self.rows[1:])
+        return '\n'.join(lines)
+
+    def render(self, table_format: str = PIPE_FORMAT) -> str:
+        """
+        Renders the table in the requested format.
+
+        Args:
+            table_format (str): PIPE_FORMAT or MARKDOWN_FORMAT.
+
+        Returns:
+            str: Text view of the table.
+        """
+        if table_format == MARKDOWN_FORMAT:
+            return self.to_markdown()
+        if table_format == PIPE_FORMAT:
+            return self.to_pipe()
+        raise ValueError(f'Unknown table format: {table_format}')
+
+    @staticmethod
+    def _markdown_row(row: Row, width: int) -> str:
+        cells = ['' if cell is None else cell.replace('\n', ' ').replace('|', '\\|') for cell in row]
+        cells.extend([''] * (width - len(cells)))
+        return '| ' + ' | '.join(cells) + ' |'
@@ -0,0 +1,16 @@
+import pytest
+
+
+class WordTokenizer(object):
+    name = 'words'
+
+    def encode(self, text):
+        return [len(word) for word in text.split()]
+
+    def decode(self, tokens):
+        return ' '.join('x' * token for token in tokens)
+
+
+@pytest.fixture
+def tokenizer():
+    return WordTokenizer()
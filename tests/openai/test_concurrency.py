@@ -0,0 +1,32 @@
+import openai
+import pytest
+from langchain_openai import OpenAIEmbeddings
+
+from benchmarks.fake_openai import FakeOpenAIConfig, serve_in_background
+from package.openai.concurrency import RATE_LIMITED, AdaptiveConcurrencyLimiter
+from package.openai.embeddings import EmbeddingDispatcher
+
+
+@pytest.fixture
+def rejecting_api():
+    server = serve_in_background(FakeOpenAIConfig(embeddings_latency=0, rate_limit_ratio=1.0, retry_after=0, dimension=8))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_rate_limit_reaches_the_limiter_on_the_first_request(rejecting_api, tokenizer):
+    model = OpenAIEmbeddings(
+        api_key='fake', base_url=rejecting_api.base_url, check_embedding_ctx_length=False, max_retries=0,
+    )
+    limiter = AdaptiveConcurrencyLimiter('embeddings', initial_limit=8, cooldown=60)
+    dispatcher = EmbeddingDispatcher(
+        model, tokenizer, max_item_tokens=100, retries=2, backoff=0, concurrency_limiter=limiter,
+    )
+
+    with pytest.raises(openai.RateLimitError):
+        dispatcher.embed(['one two'])
+
+    assert rejecting_api.stats() == {'embeddings_429': 2}
+    assert limiter.changes[RATE_LIMITED] == 1
+    assert limiter.limit == 4
@@ -0,0 +1,41 @@
+import httpx
+import openai
+import pytest
+
+from package.openai.embeddings import EmbeddingDispatcher
+
+
+class FailingModel(object):
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[float(len(text))] for text in texts]
+
+
+def api_error(error_class, status_code):
+    response = httpx.Response(status_code, request=httpx.Request('POST', 'http://localhost/v1/embeddings'))
+    return error_class('failed', response=response, body=None)
+
+
+def dispatcher(model, tokenizer):
+    return EmbeddingDispatcher(model, tokenizer, max_item_tokens=100, retries=3, backoff=0)
+
+
+def test_transient_errors_are_retried(tokenizer):
+    model = FailingModel([api_error(openai.RateLimitError, 429), api_error(openai.InternalServerError, 500)])
+
+    assert dispatcher(model, tokenizer).embed(['one two']) == [[7.0]]
+    assert model.calls == 3
+
+
+def test_invalid_request_is_not_retried(tokenizer):
+    model = FailingModel([api_error(openai.BadRequestError, 400)])
+
+    with pytest.raises(openai.BadRequestError):
+        dispatcher(model, tokenizer).embed(['one two'])
+    assert model.calls == 1
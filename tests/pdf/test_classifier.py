@@ -0,0 +1,38 @@
+from io import BytesIO
+from typing import Optional
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from package.pdf.tools import EMPTY_PAGE, TABULAR_PAGE, TEXT_PAGE, classify_page
+
+
+def page_with(content: bytes, xobject_subtype: Optional[str] = None):
+    writer = PdfWriter()
+    page = PageObject.create_blank_page(width=200, height=200)
+    stream = DecodedStreamObject()
+    stream.set_data(content)
+    page[NameObject('/Contents')] = writer._add_object(stream)
+    if xobject_subtype is not None:
+        xobject = DecodedStreamObject()
+        xobject.set_data(b'')
+        xobject.update({NameObject('/Type'): NameObject('/XObject'), NameObject('/Subtype'): NameObject(xobject_subtype)})
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({NameObject('/X0'): writer._add_object(xobject)}),
+        })
+    writer.add_page(page)
+    output = BytesIO()
+    writer.write(output)
+    return PdfReader(output).pages[0]
+
+
+def test_text_page():
+    assert classify_page(page_with(b'BT /F1 12 Tf (text) Tj ET')) == TEXT_PAGE
+
+
+def test_form_xobject_page_needs_layout_analysis():
+    assert classify_page(page_with(b'q /X0 Do Q', '/Form')) == TABULAR_PAGE
+
+
+def test_image_only_page_is_empty():
+    assert classify_page(page_with(b'q 200 0 0 200 0 0 cm /X0 Do Q', '/Image')) == EMPTY_PAGE
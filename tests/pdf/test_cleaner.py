@@ -0,0 +1,83 @@
+from package.pdf import BoilerplateCleaner
+
+
+def numbered_task_page(page_num: int) -> str:
+    tasks = []
+    for task in range(1, 4):
+        number = page_num * 3 + task
+        tasks.append(
+            f'Задача {number}\n'
+            f'Решите уравнение x = {number}.\n'
+            f'|{number}|{number + 1}|{number + 2}|{number + 3}|\n'
+            f'{number * 2}\n'
+            f'Ответ: {number}\n',
+        )
+    return ''.join(tasks)
+
+
+def report_page(page_num: int, body: str) -> str:
+    return f'ООО «Ромашка». Годовой отчёт\n{body}\nКонфиденциально\nСтр. {page_num + 1} из 10\n{page_num + 1}\n'
+
+
+def test_numbered_tasks_are_kept():
+    pages = [numbered_task_page(page_num) for page_num in range(10)]
+    cleaner = BoilerplateCleaner()
+
+    cleaned = list(cleaner.clean(pages))
+
+    assert cleaner.boilerplate == set()
+    for page, cleaned_page in zip(pages, cleaned):
+        assert cleaned_page == page.strip()
+
+
+def test_table_rows_are_never_boilerplate():
+    pages = [f'|Номер|Значение|\n|1|2|\nТекст страницы {page_num}\n' for page_num in range(5)]
+    cleaner = BoilerplateCleaner()
+
+    cleaned = list(cleaner.clean(pages))
+
+    assert all(cleaned_page.startswith('|Номер|Значение|\n|1|2|') for cleaned_page in cleaned)
+
+
+def test_headers_footers_and_page_numbers_are_removed():
+    pages = [report_page(page_num, f'Раздел {page_num}: выручка выросла на {page_num * 7}%.') for page_num in range(10)]
+    cleaner = BoilerplateCleaner()
+
+    cleaned = list(cleaner.clean(pages))
+
+    assert cleaned == [f'Раздел {page_num}: выручка выросла на {page_num * 7}%.' for page_num in range(10)]
+
+
+def test_repeated_lines_inside_the_page_are_kept():
+    bodies = [
+        f'Раздел {page_num}\nВведение {page_num}\nПовтор в середине\nЕщё текст\nПовтор в середине\nИтог {page_num}'
+        for page_num in range(5)
+    ]
+    cleaner = BoilerplateCleaner(edge_lines=2)
+
+    cleaned = list(cleaner.clean(f'Годовой отчёт\n{body}\nСтр. {page_num + 1}' for page_num, body in enumerate(bodies)))
+
+    assert cleaned == bodies
+
+
+def test_bare_numbers_are_dropped_only_when_they_continue_page_numbering():
+    pages = [f'Раздел {page_num}\nВыручка выросла на {page_num * 7}%.\n{page_num + 5}' for page_num in range(5)]
+    cleaner = BoilerplateCleaner()
+
+    cleaned = list(cleaner.clean([*pages, '12\nОтвет:\n42']))
+
+    assert cleaned[:5] == [f'Раздел {page_num}\nВыручка выросла на {page_num * 7}%.' for page_num in range(5)]
+    assert cleaned[5] == '12\nОтвет:\n42'
+
+
+def test_bare_numbers_are_kept_without_page_numbering():
+    pages = [f'Задача {page_num}\nОтвет задачи {page_num}:\n{page_num * 7 + 3}' for page_num in range(5)]
+    cleaner = BoilerplateCleaner()
+
+    assert list(cleaner.clean(pages)) == pages
+
+
+def test_hyphenated_line_breaks_keep_the_hyphen():
+    cleaner = BoilerplateCleaner()
+
+    assert cleaner.clean_page('Дул северо-\n  западный ветер') == 'Дул северо-западный ветер'
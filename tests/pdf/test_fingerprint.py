@@ -0,0 +1,20 @@
+from package.pdf import SimHash
+
+
+def test_texts_shorter_than_a_shingle_get_distinct_fingerprints():
+    first = SimHash.of(['Задача 1'])
+    second = SimHash.of(['Ответ 42'])
+
+    assert first.features == second.features == 0
+    assert first.digest() != second.digest()
+    assert first.digest() == SimHash.of(['задача', '1']).digest()
+
+
+def test_near_duplicates_are_close():
+    words = [f'слово{index}' for index in range(300)]
+    changed = words[:150] + ['вставка'] + words[150:]
+
+    first = int.from_bytes(SimHash.of([' '.join(words)]).digest(), 'big')
+    second = int.from_bytes(SimHash.of([' '.join(changed)]).digest(), 'big')
+
+    assert bin(first ^ second).count('1') <= 5